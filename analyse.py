@@ -1,8 +1,10 @@
 import pickle
+import argparse
 
 import analysis.separate
 import analysis.summary
 import analysis.dynamic
+import analysis.catalog
 
 
 def main(file_name):
@@ -16,7 +18,29 @@ def main(file_name):
     # analysis.dynamic.plot_exchanges(data=results_pool, number=4)
 
 
+def select(query):
+
+    catalog = analysis.catalog.Catalog()
+    rows = catalog.select(query)
+
+    print("{} runs selected".format(len(rows)))
+    for r in rows:
+        print(dict(r))
+
+    return catalog.load(rows)
+
+
 if __name__ == "__main__":
-    # f_name = "pool_18_02_26_16_16_05_748118"
-    f_name = "pool_18_03_19_21_25_58_613134"
-    main(f_name)
+
+    parser = argparse.ArgumentParser(description='Analyse data.')
+    parser.add_argument('-q', '--query', type=str, default=None,
+                        help="Select runs from the catalog, e.g. 'vision_area BETWEEN 2 AND 4 AND tau < 0.02'")
+    parsed_args = parser.parse_args()
+
+    if parsed_args.query is not None:
+        select(parsed_args.query)
+
+    else:
+        # f_name = "pool_18_02_26_16_16_05_748118"
+        f_name = "pool_18_03_19_21_25_58_613134"
+        main(f_name)
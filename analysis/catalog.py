@@ -0,0 +1,160 @@
+import sqlite3
+import pickle
+import os
+
+from model.data_structure import ResultPool
+from model.version import fingerprint
+
+from sweep.cache import Cache
+
+from . summary import get_summary, get_summaries
+
+
+class Catalog:
+
+    db_file = "data/catalog.db"
+
+    table = "runs"
+
+    parameters_columns = {
+        "x0": "INTEGER",
+        "x1": "INTEGER",
+        "x2": "INTEGER",
+        "stride": "INTEGER",
+        "movement_area": "INTEGER",
+        "vision_area": "INTEGER",
+        "alpha": "REAL",
+        "tau": "REAL",
+        "map_width": "INTEGER",
+        "map_height": "INTEGER",
+        "t_max": "INTEGER",
+        "seed": "INTEGER",
+        "graphics": "INTEGER",
+        "counter_rng": "INTEGER",
+        "window": "INTEGER",
+        "pyramid": "INTEGER"
+    }
+
+    metrics_columns = {
+        "m0": "INTEGER",
+        "m1": "INTEGER",
+        "m2": "INTEGER",
+        "m_sum": "INTEGER",
+        "interruptions": "INTEGER",
+        "duration": "REAL"
+    }
+
+    location_columns = {
+        "key": "TEXT",
+        "file_name": "TEXT",
+        "idx": "INTEGER",
+        "version": "TEXT"
+    }
+
+    # Sweep dimensions
+    indexed_columns = ("x0", "stride", "movement_area", "vision_area", "alpha", "tau", "m_sum")
+
+    converters = {"INTEGER": int, "REAL": float, "TEXT": str}
+
+    def __init__(self, db_file=None):
+
+        if db_file is not None:
+            self.db_file = db_file
+
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_file)
+        self.connection.row_factory = sqlite3.Row
+
+        self.columns = {}
+        for c in (self.parameters_columns, self.metrics_columns, self.location_columns):
+            self.columns.update(c)
+
+        self.create()
+
+    def create(self):
+
+        query = "CREATE TABLE IF NOT EXISTS `{}` (ID INTEGER PRIMARY KEY AUTOINCREMENT, {})".format(
+            self.table, ", ".join("`{}` {}".format(k, v) for k, v in self.columns.items()))
+
+        with self.connection:
+            self.connection.execute(query)
+
+            # Catalog created by a previous version
+            existing = [r[1] for r in self.connection.execute("PRAGMA table_info(`{}`)".format(self.table))]
+            for k, v in self.columns.items():
+                if k not in existing:
+                    self.connection.execute("ALTER TABLE `{}` ADD COLUMN `{}` {}".format(self.table, k, v))
+
+            self.connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS `{}_key` ON `{}` (`key`)".format(self.table, self.table))
+
+            for c in self.indexed_columns:
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS `{}_{}` ON `{}` (`{}`)".format(self.table, c, self.table, c))
+
+    def row(self, result, file_name, idx, summary=None):
+
+        a = summary if summary is not None else get_summary(result)
+
+        values = {k: getattr(result.parameters, k) for k in self.parameters_columns}
+        values.update(
+            m0=a.m0, m1=a.m1, m2=a.m2, m_sum=a.m0 + a.m1 + a.m2, interruptions=a.interruptions,
+            duration=getattr(result, "duration", None),
+            key=Cache.key(result.parameters.__dict__), file_name=file_name, idx=idx, version=fingerprint())
+
+        # sqlite3 does not know about numpy types
+        return tuple(self.converters[v](values[k]) if values[k] is not None else None
+                     for k, v in self.columns.items())
+
+    def insert(self, data, file_name=None):
+
+        if isinstance(data, ResultPool):
+            rows = [self.row(d, file_name=data.pickle_file, idx=i, summary=a)
+                    for i, (d, a) in enumerate(zip(data.data, get_summaries(data.data)))]
+        else:
+            rows = [self.row(data, file_name=file_name or data.pickle_file, idx=None)]
+
+        # A run already in the catalog is only relocated
+        query = "INSERT OR REPLACE INTO `{}` ({}) VALUES ({})".format(
+            self.table,
+            ", ".join("`{}`".format(k) for k in self.columns),
+            ", ".join("?" for _ in self.columns))
+
+        with self.connection:
+            self.connection.executemany(query, rows)
+
+    def forget(self, keys, folder=Cache.folder):
+
+        # Runs evicted from the cache: their rows would point to deleted files
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM `{}` WHERE `key` = ? AND `file_name` LIKE ?".format(self.table),
+                [(k, folder + "%") for k in keys])
+
+    def select(self, where="1", args=()):
+
+        # 'where' is a SQL condition, e.g. "vision_area BETWEEN 2 AND 4 AND tau < 0.02"
+        return self.connection.execute(
+            "SELECT * FROM `{}` WHERE {}".format(self.table, where), args).fetchall()
+
+    @staticmethod
+    def load(rows):
+
+        files = {}
+        results = []
+
+        for r in rows:
+
+            if r["file_name"] not in files:
+                with open(r["file_name"], "rb") as f:
+                    files[r["file_name"]] = pickle.load(f)
+
+            d = files[r["file_name"]]
+            results.append(d.data[r["idx"]] if r["idx"] is not None else d)
+
+        return results
+
+    def close(self):
+
+        self.connection.close()
@@ -1,36 +1,23 @@
-import numpy as np
-import matplotlib.colors
 import matplotlib.pyplot as plt
 
-from . dynamic_plot import exchanges, moves
+from . dynamic_plot import exchanges, moves, frames, viewer
 
 
 def plot_moves(data, number):
 
     bkp = data.data[number]
 
-    agent_type = np.array(
-        [0, ] * bkp.parameters.x0 + [1, ] * bkp.parameters.x1 + [2, ] * bkp.parameters.x2)
-
-    n = bkp.parameters.x0 + bkp.parameters.x1 + bkp.parameters.x2
-
-    a = bkp.agent_maps.copy()
-    for i in range(n):
-        a[a == i] = agent_type[i]
+    # Agent ids are coloured by type frame by frame, when shown
+    a = frames.agent_frames(bkp.agent_maps, bkp.parameters)
 
     if bkp.parameters.stride > 0:
         moves.plot(data=a)
 
     else:
-        color_list = ['white', 'C0', 'C1', 'C2']
-        color_map = matplotlib.colors.ListedColormap(color_list)
-
         fig = plt.figure(figsize=(10, 10), facecolor='white', dpi=72)
         ax = fig.add_subplot(111)
 
-        ax.imshow(
-            a[0], interpolation='none', aspect='auto', origin='upper',
-            cmap=color_map, vmin=-1, vmax=len(color_list) - 1)
+        ax.imshow(a[0], interpolation='none', aspect='auto', origin='upper')
 
         ax.set_xticks([])
         ax.set_yticks([])
@@ -39,6 +26,37 @@ def plot_moves(data, number):
         plt.show()
 
 
+def plot_pyramid(data, number, level=None, max_size=256):
+
+    # Large maps: blocks of cells, at the finest level that fits in 'max_size' (level 0 is the maps themselves)
+    r = data.data[number]
+    pyramid = r.pyramid
+
+    if pyramid is None:
+        raise ValueError("Run {} has no pyramid (set 'pyramid' in the parameters)".format(number))
+
+    if not pyramid.complete:
+        raise ValueError("Pyramid of run {} has been evicted from the cache".format(number))
+
+    shapes = [(r.parameters.map_width, r.parameters.map_height)] + pyramid.shapes
+    if level is None:
+        level = next((k for k, s in enumerate(shapes) if max(s) <= max_size), pyramid.n_levels)
+
+    if not 0 <= level <= pyramid.n_levels:
+        raise ValueError("Level {} does not exist, the pyramid of run {} has {} level(s)".format(
+            level, number, pyramid.n_levels))
+
+    if level > 0:
+        viewer.view(frames.pyramid_frames(pyramid, level), title="Level {}".format(level))
+
+    elif r.agent_maps is not None:
+        # Small maps (or level 0): full resolution
+        viewer.view(frames.agent_frames(r.agent_maps, r.parameters), title="Level 0")
+
+    else:
+        raise ValueError("Maps of run {} are too small for the pyramid and have not been recorded".format(number))
+
+
 def plot_exchanges(data, number):
     print(data.data[number].exchange_maps.shape[0])
     exchanges.plot(data.data[number].exchange_maps, mode=exchanges.Mode.ON_KEY_PRESS)
@@ -1,9 +1,10 @@
 from enum import Enum, auto
 import numpy as np
-import matplotlib.colors
 import matplotlib.animation
 import matplotlib.pyplot as plt
-import matplotlib.cm
+
+from . frames import count_frames, sample_max, Row
+from . import video, viewer
 
 
 class Mode(Enum):
@@ -19,13 +20,13 @@ class Plot:
 
     video_name = "SpatialEconomyExchanges.mp4"
 
-    def __init__(self, data=None, mode=Mode.DISPLAY):
+    def __init__(self, data=None, mode=Mode.DISPLAY, **video_options):
 
         if data is None:
             print("Demo data are used")
-            self.data = np.random.random(size=(100, 3, 10, 10))
-        else:
-            self.data = data  # Shape is t_max, n_types, width, height
+            data = np.random.randint(10, size=(100, 3, 10, 10))
+
+        self.data = data  # Shape is t_max, n_types, width, height
 
         self.mode = mode
 
@@ -37,20 +38,26 @@ class Plot:
 
         self.im = []
 
+        # Coloured when shown, with the same scale for all (estimated: the history is not read)
+        vmax = sample_max(data)
+        self.frames = []
+
         for (i, cmap) in enumerate(cmaps):
 
             ax = self.fig.add_subplot(2, 2, i+1)
             ax.set_xticks([])
             ax.set_yticks([])
 
+            self.frames.append(count_frames(data[:, i], vmax=vmax, cmap=cmap))
+
             self.im.append(
-                ax.imshow(data[0, i, :, :], cmap=matplotlib.cm.get_cmap(cmap),
-                          vmin=0, vmax=np.max(data), aspect=1,
-                          interpolation='none', origin='upper')
+                ax.imshow(self.frames[i][0], aspect=1, interpolation='none', origin='upper')
             )
 
         plt.tight_layout()
 
+        self.video_options = video_options  # See 'video.export' (fps, stride, scale...)
+
         self.run()
 
     def run(self):
@@ -62,22 +69,14 @@ class Plot:
             # 'animation =' is necessary
 
         elif self.mode == Mode.ON_KEY_PRESS:
-            self.fig.canvas.mpl_connect('key_press_event', self.time_step)
+            # Blitted viewer of the three types side by side, with frames read when needed
+            plt.close(self.fig)
+            self.viewer = viewer.Viewer(Row(self.frames), title=self.video_name.split(".")[0])
 
         else:
-            print("Creating video! Could need some time to complete!")
-
-            ffmpeg_writer = matplotlib.animation.writers['ffmpeg']
-            metadata = dict(title=self.video_name.split(".")[0], artist='Matplotlib',
-                            comment='')
-            writer = ffmpeg_writer(fps=15, metadata=metadata)
-
-            n_frames = len(self.data)
-
-            with writer.saving(self.fig, self.video_name, n_frames):
-                for i in range(n_frames):
-                    self.time_step()
-                    writer.grab_frame()
+            # Frames of the three types side by side, rendered without the figure
+            video.export(Row(self.frames), self.video_name, **self.video_options)
+            plt.close(self.fig)
 
         if self.mode != Mode.SAVE:
             plt.show()
@@ -92,15 +91,12 @@ class Plot:
 
         for i in range(3):
 
-            self.im[i].set_array(self.data[self.t, i])
-
-            if self.mode == Mode.ON_KEY_PRESS:
-                self.fig.canvas.draw()
+            self.im[i].set_data(self.frames[i][self.t])
 
 
-def plot(data=None, mode=Mode.DISPLAY):
+def plot(data=None, mode=Mode.DISPLAY, **video_options):
 
-    Plot(data=data, mode=mode)
+    Plot(data=data, mode=mode, **video_options)
 
 
 if __name__ == "__main__":
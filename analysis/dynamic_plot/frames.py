@@ -0,0 +1,106 @@
+import numpy as np
+import matplotlib.colors
+import matplotlib.pyplot
+
+
+class Frames:
+
+    def __init__(self, data, lut, offset=0):
+
+        # RGB frames computed on demand with a single gather: colour = lut[value + offset]
+        self.data = data
+        self.lut = lut
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, t):
+        # Values beyond the table get its last colour
+        return self.lut[np.minimum(self.data[t] + self.offset, len(self.lut) - 1)]
+
+
+def _rgb(colors):
+    return (np.array([matplotlib.colors.to_rgb(c) for c in colors]) * 255).astype(np.uint8)
+
+
+type_colors = ['white', 'C0', 'C1', 'C2']  # Empty cell, then one colour per type
+
+
+def agent_types(parameters):
+    return np.array([0, ] * parameters.x0 + [1, ] * parameters.x1 + [2, ] * parameters.x2)
+
+
+def type_frames(type_maps):
+
+    # Maps of types (-1 for an empty cell)
+    return Frames(type_maps, _rgb(type_colors), offset=1)
+
+
+def agent_frames(agent_maps, parameters):
+
+    # Maps of agent ids (-1 for an empty cell): id -> type -> colour in one lookup table
+    lut = _rgb(type_colors)[np.concatenate(([0], agent_types(parameters) + 1))]
+    return Frames(agent_maps, lut, offset=1)
+
+
+def sample_max(data, n_samples=64):
+
+    # Maximum over a few frames only: the whole history is not read
+    steps = np.unique(np.linspace(0, len(data) - 1, min(n_samples, len(data))).astype(int))
+    return max(int(np.max(data[t])) for t in steps)
+
+
+def count_frames(count_maps, vmax, cmap="hot"):
+
+    # Maps of counts, coloured from 0 to 'vmax'
+    vmax = max(1, int(vmax))
+    lut = (matplotlib.pyplot.get_cmap(cmap)(np.arange(vmax + 1) / vmax)[:, :3] * 255).astype(np.uint8)
+    return Frames(count_maps, lut)
+
+
+class Row:
+
+    def __init__(self, frames, gap=1):
+
+        # Several sequences of frames side by side, separated by white columns
+        self.frames = frames
+        self.gap = gap
+
+    def __len__(self):
+        return min(len(f) for f in self.frames)
+
+    def __getitem__(self, t):
+
+        images = [f[t] for f in self.frames]
+        white = np.full((images[0].shape[0], self.gap, 3), 255, dtype=np.uint8)
+
+        row = [images[0]]
+        for im in images[1:]:
+            row += [white, im]
+
+        return np.hstack(row)
+
+
+class DensityFrames:
+
+    def __init__(self, type_counts, capacity):
+
+        # Blocks coloured by their share of agents of each type (white if empty)
+        self.data = type_counts  # Shape is t_max, n_types, width, height
+        self.capacity = capacity
+        self.shade = 255 - _rgb(type_colors[1:]).astype(float)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, t):
+
+        share = self.data[t] / self.capacity
+        return np.clip(255 - np.tensordot(share, self.shade, axes=(0, 0)), 0, 255).astype(np.uint8)
+
+
+def pyramid_frames(pyramid, level):
+
+    type_counts, exchange_sums, block_size = pyramid.level(level)
+    return DensityFrames(type_counts, block_size ** 2)
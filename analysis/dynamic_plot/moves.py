@@ -1,9 +1,11 @@
 from enum import Enum, auto
 from pylab import plt, np
-import matplotlib.colors
 import matplotlib.animation
 import matplotlib.pyplot
 
+from . frames import type_frames
+from . import video, viewer
+
 
 class Mode(Enum):
 
@@ -16,18 +18,15 @@ class Plot:
 
     matplotlib.pyplot.rcParams['toolbar'] = 'None'
 
-    color_list = ['white', 'C0', 'C1', 'C2']
-    color_map = matplotlib.colors.ListedColormap(color_list)
-
     video_name = "SpatialEconomy.mp4"
 
-    def __init__(self, data=None, mode=Mode.DISPLAY):
+    def __init__(self, data=None, mode=Mode.DISPLAY, **video_options):
 
         if data is None:
             print("Demo data are used")
-            self.data = np.random.randint(len(self.color_list), size=(10, 4, 4))
-        else:
-            self.data = data
+            data = type_frames(np.random.randint(-1, 3, size=(10, 4, 4)))
+
+        self.data = data  # RGB frames (see 'frames'), computed when shown
 
         self.mode = mode
 
@@ -38,14 +37,14 @@ class Plot:
         self.fig.subplots_adjust(top=.96, bottom=.02, left=.02, right=.98)
         self.ax = self.fig.add_subplot(111)
 
-        self.im = self.ax.imshow(
-            self.data[0], interpolation='none', aspect='auto', origin='upper',
-            cmap=self.color_map, vmin=-1, vmax=len(self.color_list) - 1)
+        self.im = self.ax.imshow(self.data[0], interpolation='none', aspect='auto', origin='upper')
 
         self.t = 0
 
         self.animation = None
 
+        self.video_options = video_options  # See 'video.export' (fps, stride, scale...)
+
         self.run()
 
     def run(self):
@@ -56,40 +55,29 @@ class Plot:
             self.animation = matplotlib.animation.FuncAnimation(self.fig, self.time_step, interval=60)
 
         elif self.mode == Mode.ON_KEY_PRESS:
-            self.fig.canvas.mpl_connect('key_press_event', self.time_step)
+            # Blitted viewer, with frames read when needed
+            matplotlib.pyplot.close(self.fig)
+            self.viewer = viewer.Viewer(self.data, title=self.video_name.split(".")[0])
 
         else:
-            print("Creating video! Could need some time to complete!")
-
-            ffmpeg_writer = matplotlib.animation.writers['ffmpeg']
-            metadata = dict(title=self.video_name.split(".")[0], artist='Matplotlib',
-                            comment='')
-            writer = ffmpeg_writer(fps=15, metadata=metadata)
-
-            n_frames = len(self.data)
-
-            with writer.saving(self.fig, self.video_name, n_frames):
-                for i in range(n_frames):
-                    self.time_step()
-                    writer.grab_frame()
+            # Frames are rendered without the figure
+            video.export(self.data, self.video_name, **self.video_options)
+            matplotlib.pyplot.close(self.fig)
 
         if self.mode != Mode.SAVE:
             plt.show()
 
     def time_step(self, *args):
 
-        self.im.set_array(self.data[self.t])
+        self.im.set_data(self.data[self.t])
 
         if not self.t+1 >= len(self.data):
             self.t += 1
 
-        if self.mode == Mode.ON_KEY_PRESS:
-            self.fig.canvas.draw()
-
 
-def plot(data=None, mode=Mode.DISPLAY):
+def plot(data=None, mode=Mode.DISPLAY, **video_options):
 
-    Plot(data=data, mode=mode)
+    Plot(data=data, mode=mode, **video_options)
 
 
 if __name__ == "__main__":
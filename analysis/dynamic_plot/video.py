@@ -0,0 +1,96 @@
+import multiprocessing
+import collections
+import subprocess
+import shutil
+import os
+
+import numpy as np
+
+# Frames of the current export, inherited by the workers
+_frames = None
+
+
+def _init_worker(frames):
+
+    global _frames
+    _frames = frames
+
+
+def _render(args):
+
+    # Chunk of frames, scaled, as raw RGB bytes (or written as PNG files)
+    steps, scale, png_folder = args
+
+    images = []
+    for t in steps:
+        im = _frames[t]
+        if scale > 1:
+            im = np.repeat(np.repeat(im, scale, axis=0), scale, axis=1)
+        images.append(im)
+
+    if png_folder is None:
+        return b"".join(np.ascontiguousarray(im).tobytes() for im in images)
+
+    import matplotlib.image
+    for t, im in zip(steps, images):
+        matplotlib.image.imsave("{}/frame_{:06d}.png".format(png_folder, t), im)
+    return b""
+
+
+def _ffmpeg(file_name, width, height, fps):
+
+    return subprocess.Popen([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", "{}x{}".format(width, height), "-r", str(fps), "-i", "-",
+        # Most players need even dimensions
+        "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2:color=white",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", file_name
+    ], stdin=subprocess.PIPE)
+
+
+def export(frames, file_name, fps=15, stride=1, scale=None, n_workers=None, chunk_size=64):
+
+    # 'frames' gives RGB frames (see 'frames'); they are rendered in parallel and piped to ffmpeg
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    height, width = frames[0].shape[:2]
+    if scale is None:
+        scale = max(1, 512 // max(width, height))
+
+    steps = list(range(0, len(frames), stride))
+    chunks = [steps[i:i + chunk_size] for i in range(0, len(steps), chunk_size)]
+
+    if shutil.which("ffmpeg") is not None:
+        png_folder = None
+        encoder = _ffmpeg(file_name, width * scale, height * scale, fps)
+        print("Creating video '{}' ({} frames)".format(file_name, len(steps)))
+
+    else:
+        png_folder = os.path.splitext(file_name)[0] + "_frames"
+        os.makedirs(png_folder, exist_ok=True)
+        encoder = None
+        print("ffmpeg not found: frames are written in '{}'".format(png_folder))
+
+    with multiprocessing.Pool(n_workers, initializer=_init_worker, initargs=(frames, )) as pool:
+
+        # Frames go to ffmpeg in order, with a bounded number of chunks in advance
+        pending = collections.deque()
+        for c in chunks:
+            pending.append(pool.apply_async(_render, ((c, scale, png_folder), )))
+            if len(pending) >= 2 * n_workers:
+                _write(encoder, pending.popleft().get())
+
+        while pending:
+            _write(encoder, pending.popleft().get())
+
+    if encoder is not None:
+        encoder.stdin.close()
+        if encoder.wait() != 0:
+            raise RuntimeError("ffmpeg failed to create '{}'".format(file_name))
+
+
+def _write(encoder, data):
+
+    if encoder is not None:
+        encoder.stdin.write(data)
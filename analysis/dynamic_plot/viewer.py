@@ -0,0 +1,215 @@
+import concurrent.futures
+import collections
+import threading
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.patches
+
+
+class FrameCache:
+
+    def __init__(self, frames, size=256, prefetch=16):
+
+        # Frames are computed when first needed, the last 'size' ones are kept
+        self.frames = frames
+        self.size = size
+        self.prefetch = prefetch
+
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        # Next frames (in the current direction) are prepared in the background
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.scheduled = set()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def _get(self, t):
+
+        with self.lock:
+            if t in self.cache:
+                self.cache.move_to_end(t)
+                return self.cache[t]
+
+        im = self.frames[t]
+
+        with self.lock:
+            self.cache[t] = im
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+
+        return im
+
+    def _fetch(self, t):
+
+        try:
+            self._get(t)
+        finally:
+            with self.lock:
+                self.scheduled.discard(t)
+
+    def get(self, t, direction=1):
+
+        im = self._get(t)
+
+        for k in range(1, self.prefetch + 1):
+            u = t + k * direction
+            if not 0 <= u < len(self.frames):
+                break
+            with self.lock:
+                if u in self.cache or u in self.scheduled:
+                    continue
+                self.scheduled.add(u)
+            self.executor.submit(self._fetch, u)
+
+        return im
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class Viewer:
+
+    # Key: number of steps
+    keys = {"right": 1, "left": -1, "up": 10, "down": -10, "pageup": 100, "pagedown": -100}
+
+    def __init__(self, frames, title="", fps=15, cache_size=256, prefetch=16):
+
+        # Only the frames shown (and the next ones) are read: opening a run is instant whatever its length
+        self.frames = FrameCache(frames, size=cache_size, prefetch=prefetch)
+        self.n = len(frames)
+
+        self.t = 0
+        self.direction = 1
+
+        self.fig = plt.figure(figsize=(10, 10), facecolor='white', dpi=72)
+        if self.fig.canvas.manager is not None:
+            self.fig.canvas.manager.set_window_title(title)
+
+        # Frames are drawn at an integer scale in this box, without resampling
+        self.ax = self.fig.add_axes((.02, .06, .96, .92))
+        self.ax.axis("off")
+        self.scale = 1
+
+        self.im = self.fig.figimage(np.zeros((1, 1, 3), dtype=np.uint8), origin='upper', animated=True)
+        self.label = self.ax.text(0.01, 0.99, "", transform=self.ax.transAxes, va="top",
+                                  backgroundcolor="white", animated=True)
+
+        # Progress bar: click or drag to seek
+        self.bar_ax = self.fig.add_axes((.02, .015, .96, .03))
+        self.bar_ax.set_xlim(0, max(1, self.n - 1))
+        self.bar_ax.set_ylim(0, 1)
+        self.bar_ax.set_xticks([])
+        self.bar_ax.set_yticks([])
+        self.bar = matplotlib.patches.Rectangle((0, 0), 0, 1, color="C0", animated=True)
+        self.bar_ax.add_patch(self.bar)
+
+        self.background = None
+        self.scrubbing = False
+
+        self.timer = self.fig.canvas.new_timer(interval=int(1000 / fps))
+        self.timer.add_callback(self.step, 1)
+        self.playing = False
+
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+        self.fig.canvas.mpl_connect('key_press_event', self.on_key)
+        self.fig.canvas.mpl_connect('button_press_event', self.on_press)
+        self.fig.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.fig.canvas.mpl_connect('button_release_event', self.on_release)
+        self.fig.canvas.mpl_connect('close_event', lambda event: self.frames.close())
+
+        self.update_artists()
+
+    def on_draw(self, event):
+
+        # Everything but the animated artists, restored before each frame
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+        # Figure may have been resized
+        box = self.ax.get_window_extent()
+        h, w = self.frames.get(self.t).shape[:2]
+        self.scale = max(1, int(min(box.width / w, box.height / h)))
+        self.im.ox = box.x0 + (box.width - w * self.scale) / 2
+        self.im.oy = box.y0 + (box.height - h * self.scale) / 2
+
+        self.update_artists()
+        self.draw_artists()
+
+    def update_artists(self):
+
+        im = self.frames.get(self.t, self.direction)
+        self.im.set_data(np.repeat(np.repeat(im, self.scale, axis=0), self.scale, axis=1))
+        self.label.set_text("t = {} / {}".format(self.t, self.n - 1))
+        self.bar.set_width(self.t)
+
+    def draw_artists(self):
+
+        self.fig.draw_artist(self.im)
+        self.ax.draw_artist(self.label)
+        self.bar_ax.draw_artist(self.bar)
+
+    def seek(self, t):
+
+        t = min(max(int(t), 0), self.n - 1)
+        if t == self.t:
+            return
+
+        self.direction = 1 if t > self.t else -1
+        self.t = t
+        self.update_artists()
+
+        if self.background is None:
+            self.fig.canvas.draw_idle()
+            return
+
+        self.fig.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.fig.canvas.blit(self.fig.bbox)
+
+    def step(self, n):
+
+        self.seek(self.t + n)
+        if self.playing and self.t == self.n - 1:
+            self.toggle()
+
+    def toggle(self):
+
+        self.playing = not self.playing
+        if self.playing:
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def on_key(self, event):
+
+        if event.key in self.keys:
+            self.step(self.keys[event.key])
+        elif event.key == "home":
+            self.seek(0)
+        elif event.key == "end":
+            self.seek(self.n - 1)
+        elif event.key == " ":
+            self.toggle()
+
+    def on_press(self, event):
+
+        if event.inaxes == self.bar_ax:
+            self.scrubbing = True
+            self.seek(round(event.xdata))
+
+    def on_motion(self, event):
+
+        if self.scrubbing and event.inaxes == self.bar_ax:
+            self.seek(round(event.xdata))
+
+    def on_release(self, event):
+        self.scrubbing = False
+
+
+def view(frames, title="", **options):
+
+    viewer = Viewer(frames, title=title, **options)
+    plt.show()
+    return viewer
@@ -0,0 +1,86 @@
+import multiprocessing
+import signal
+import copy
+import time
+
+from model.data_structure import ResultPool
+
+from . import separate, summary
+
+
+def _init_worker():
+
+    # Interruptions are handled by the main process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    separate.init_worker()
+
+
+class Pipeline:
+
+    # Seconds between two updates of the summary figure
+    refresh = 60
+
+    def __init__(self, file_name, parameters, n_workers=1):
+
+        # Results are analysed as they come, while the other runs go on
+        self.file_name = file_name
+        self.parameters = parameters
+
+        self.results = {}
+
+        self.pool = multiprocessing.Pool(n_workers, initializer=_init_worker)
+        self.pending = []
+        self.summary_plot = None
+        self.last_refresh = time.time()
+
+    def put(self, i, result):
+
+        if separate.has_series(result):
+            job = separate.pool_job(self.file_name, i, result)
+            if job is not None:
+                self.pending.append(self.pool.apply_async(separate.draw, (job, )))
+
+        # Only what the summary figure needs is kept
+        light = copy.copy(result)
+        light.summary = summary.get_summary(result)
+        for k in ("agent_maps", "exchange_maps", "direct_exchanges_proportions", "indirect_exchanges_proportions",
+                  "direct_series", "indirect_series"):
+            setattr(light, k, None)
+        self.results[i] = light
+
+        # Errors in the figures are raised here
+        for p in self.pending:
+            if p.ready():
+                p.get()
+        self.pending = [p for p in self.pending if not p.ready()]
+
+        if time.time() - self.last_refresh > self.refresh:
+            self._refresh()
+
+    def _refresh(self):
+
+        # Previous one is still being drawn
+        if self.summary_plot is not None and not self.summary_plot.ready():
+            return
+
+        self.last_refresh = time.time()
+
+        data = ResultPool(data=[self.results[i] for i in sorted(self.results)], parameters=self.parameters)
+        data.file_name = self.file_name
+
+        self.summary_plot = self.pool.apply_async(summary.plot, (data, ))
+
+    def terminate(self):
+
+        # Figures being drawn are abandoned (they are drawn again by the next run)
+        self.pool.terminate()
+        self.pool.join()
+
+    def close(self):
+
+        self.pool.close()
+        self.pool.join()
+
+        for p in self.pending + [self.summary_plot]:
+            if p is not None:
+                p.get()
@@ -1,12 +1,58 @@
+import multiprocessing
+import functools
+import hashlib
+import shutil
+import copy
+import json
 import os
-import matplotlib.pyplot as plt
 
+import numpy as np
 
 from model.data_structure import ResultPool
 
+from sweep.cache import Cache
+
+# Figures of the runs of a pool, shared by all the pools containing them
+runs_folder = "figures/runs/"
+
+
+@functools.lru_cache(maxsize=None)
+def _code_tag():
+
+    # Figures are redrawn if the way they are drawn changes
+    with open(__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _tag(data, title):
+
+    h = hashlib.sha1()
+    h.update(_code_tag().encode())
+    h.update(title.encode())
+    h.update(json.dumps(data.parameters.__dict__, sort_keys=True, default=str).encode())
+
+    if data.indirect_exchanges_proportions is not None:
+        h.update(np.ascontiguousarray(data.indirect_exchanges_proportions).tobytes())
+    else:
+        for a in data.indirect_series.aggregates():
+            h.update(np.ascontiguousarray(a).tobytes())
+
+    return h.hexdigest()
+
+
+def _up_to_date(file_name, tag):
+
+    try:
+        with open("{}.tag".format(file_name)) as f:
+            return f.read() == tag and os.path.exists(file_name)
+    except OSError:
+        return False
+
 
 def _plot(data, file_name, title=""):
 
+    import matplotlib.pyplot as plt
+
     param_str = \
         "x: {}, stride: {}, movement_area: {}, vision_area: {}, " \
         "alpha: {:.2f}, tau: {:.2f}, map_width: {}, map_height: {}" \
@@ -21,7 +67,18 @@ def _plot(data, file_name, title=""):
 
     fig = plt.figure()
     ax = fig.add_subplot(111)
-    lines = ax.plot(data.indirect_exchanges_proportions)
+
+    if data.indirect_exchanges_proportions is not None:
+        lines = ax.plot(data.indirect_exchanges_proportions)
+
+    else:
+        # Only aggregates are kept: mean, and range over each block
+        t, means, mins, maxs = data.indirect_series.aggregates()
+        t = t + data.indirect_series.block_size / 2
+        lines = ax.plot(t, means)
+        for i, line in enumerate(lines):
+            ax.fill_between(t, mins[:, i], maxs[:, i], color=line.get_color(), alpha=0.2, linewidth=0)
+
     ax.set_ylim(0., 1.)
     ax.set_xlabel("t")
     ax.set_ylabel("Indirect exchanges proportion")
@@ -34,15 +91,109 @@ def _plot(data, file_name, title=""):
     plt.close(fig)
 
 
-def plot_indirect_exchanges(data):
+def _link(file_name, link):
+
+    if os.path.exists(link) and os.path.samefile(file_name, link):
+        return
+
+    os.makedirs(os.path.dirname(link), exist_ok=True)
+    tmp_link = "{}.tmp".format(link)
+    if os.path.exists(tmp_link):
+        os.remove(tmp_link)
+    try:
+        os.link(file_name, tmp_link)
+    except OSError:
+        shutil.copyfile(file_name, tmp_link)
+    os.replace(tmp_link, link)
+
+
+def draw(args):
+
+    data, file_name, title, tag, links = args
+
+    _plot(data=data, file_name=file_name, title=title)
+
+    # Tag is only written once the figure is complete
+    with open("{}.tag".format(file_name), "w") as f:
+        f.write(tag)
+
+    for link in links:
+        _link(file_name, link)
+
+
+def init_worker():
+
+    # No display in the workers
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _draw(jobs, n_workers):
+
+    if n_workers == 1 or len(jobs) < 2:
+        for j in jobs:
+            draw(j)
+        return
+
+    with multiprocessing.Pool(min(n_workers, len(jobs)), initializer=init_worker) as pool:
+        for _ in pool.imap_unordered(draw, jobs, chunksize=max(1, len(jobs) // (8 * n_workers))):
+            pass
+
+
+def _job(data, file_name, title, force, links=()):
+
+    tag = _tag(data, title)
+    if not force and _up_to_date(file_name, tag):
+        for link in links:
+            _link(file_name, link)
+        return None
+
+    # Maps are not needed (and would be sent to the workers)
+    data = copy.copy(data)
+    data.agent_maps = None
+    data.exchange_maps = None
+
+    return data, file_name, title, tag, links
+
+
+def has_series(data):
+
+    # Pool produced with 'summary' output has none
+    return data.indirect_exchanges_proportions is not None or data.indirect_series is not None
+
+
+def pool_job(pool_file_name, i, data, force=False):
+
+    # Figure is keyed on the run: a run found in another pool (or in a grown one) is not drawn again,
+    # only linked in the folder of the pool
+    key = Cache.key(data.parameters.__dict__)
+    file_name = "{}{}_indirect.pdf".format(runs_folder, key)
+    link = "figures/{}/ind/{}_indirect_{}.pdf".format(pool_file_name, pool_file_name, i)
+
+    return _job(data=data, title="Run {}".format(key[:12]), file_name=file_name, force=force, links=(link, ))
+
+
+def plot_indirect_exchanges(data, n_workers=None, force=False):
+
+    if n_workers is None:
+        n_workers = os.cpu_count()
+
+    jobs = []
 
     if isinstance(data, ResultPool):
 
         for i, single_d in enumerate(data.data):
-            file_name = "figures/{}/ind/{}_indirect_{}.pdf".format(data.file_name, data.file_name, i)
-            title = "{}: {}".format(data.file_name, i)
-            _plot(data=single_d, title=title, file_name=file_name)
+            if has_series(single_d):
+                jobs.append(pool_job(data.file_name, i, single_d, force=force))
 
     else:
         file_name = "figures/{}/{}_indirect.pdf".format(data.file_name, data.file_name)
-        _plot(data=data, file_name=file_name)
+        jobs.append(_job(data=data, title="", file_name=file_name, force=force))
+
+    n_up_to_date = jobs.count(None)
+    jobs = [j for j in jobs if j is not None]
+
+    if n_up_to_date:
+        print("{} figures up to date, {} to draw".format(n_up_to_date, len(jobs)))
+
+    _draw(jobs, n_workers)
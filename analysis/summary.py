@@ -1,94 +1,151 @@
 import numpy as np
 import enum
 import os
-import matplotlib.pyplot as plt
 
+from model.statistics import summarize, summarize_pool, current_summary
 
-class MoneyAnalysis:
 
-    def __init__(self, m0, m1, m2, interruptions):
+def get_summary(result):
 
-        self.m0 = m0
-        self.m1 = m1
-        self.m2 = m2
-        self.interruptions = interruptions
+    # Summary is computed by the workers, except for old data
+    summary = current_summary(result)
+    if summary is not None:
+        return summary
+    return summarize(result)
 
 
-class MoneyAnalyst(object):
+def get_summaries(results):
 
-    money_threshold = .75
+    # Summaries computed by the workers are reused, the others are computed at once
+    summaries = [current_summary(r) for r in results]
 
-    @classmethod
-    def _test_for_money_state(cls, direct_exchange, indirect_exchange):
+    missing = [i for i, a in enumerate(summaries) if a is None]
+    for i, a in zip(missing, summarize_pool([results[i] for i in missing])):
+        summaries[i] = a
 
-        money = -1
+    return summaries
 
-        # Money = 0?
-        # type '0' should use direct exchange
-        cond0 = direct_exchange[0] > cls.money_threshold
 
-        # type '1' should use indirect exchange
-        cond1 = indirect_exchange[1] > cls.money_threshold
+# Above this number of runs, the summary figure shows densities instead of points
+scatter_limit = 5000
 
-        # type '2' should use direct exchange
-        cond2 = direct_exchange[2] > cls.money_threshold
+bins_folder = "data/summary_bins/"
 
-        if (cond0 * cond1 * cond2) == 1:
+# Variable in abscissa: (label, function of the parameters)
+binned_variables = {
+    "tau": (r"$\tau$", lambda p: p.tau),
+    "alpha": (r"$\alpha$", lambda p: p.alpha),
+    "vision_area": (r"vision area", lambda p: p.vision_area),
+    "x": (r"n agents", lambda p: p.x0 + p.x1 + p.x2)
+}
 
-            money = 0
 
-        else:
+def _edges(values, n_bins):
 
-            # Money = 1?
-            cond0 = direct_exchange[0] > cls.money_threshold
-            cond1 = direct_exchange[1] > cls.money_threshold
-            cond2 = indirect_exchange[2] > cls.money_threshold
+    lo, hi = values.min(), values.max()
 
-            if (cond0 * cond1 * cond2) == 1:
+    # Integers: one bin per value or per group of values
+    if np.issubdtype(values.dtype, np.integer):
+        step = max(1, int(np.ceil((hi - lo + 1) / n_bins)))
+        return np.arange(lo, hi + step + 1, step) - 0.5
 
-                money = 1
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, n_bins + 1)
 
-            else:
 
-                # Money = 2?
-                cond0 = indirect_exchange[0] > cls.money_threshold
-                cond1 = direct_exchange[1] > cls.money_threshold
-                cond2 = direct_exchange[2] > cls.money_threshold
+def bin_pool(data, n_bins=50):
 
-                if (cond0 * cond1 * cond2) == 1:
-                    money = 2
+    # Densities and per-bin statistics of the number of monetary states, for each variable
+    y = np.array([a.m0 + a.m1 + a.m2 for a in get_summaries(data.data)])
+    y_edges = _edges(y, n_bins)
 
-        return money
+    bins = {"n": np.array(len(y))}
 
-    @classmethod
-    def run(cls, direct_exchange, indirect_exchange, t_max):
+    for name, (label, f) in binned_variables.items():
 
-        money_time_line = np.zeros(t_max)
-        money = {0: 0, 1: 0, 2: 0, -1: 0}
-        interruptions = 0
+        x = np.array([f(d.parameters) for d in data.data])
+        x_edges = _edges(x, n_bins)
 
-        for t in range(t_max):
+        counts, _, _ = np.histogram2d(x, y, bins=(x_edges, y_edges))
 
-            money_t = cls._test_for_money_state(
-                direct_exchange=direct_exchange[t],
-                indirect_exchange=indirect_exchange[t])
-            money_time_line[t] = money_t
-            money[money_t] += 1
+        # Per-bin quantiles: runs sorted by bin, then by value
+        idx = np.clip(np.searchsorted(x_edges, x, side="right") - 1, 0, len(x_edges) - 2)
+        order = np.lexsort((y, idx))
+        n = np.bincount(idx, minlength=len(x_edges) - 1)
+        start = np.cumsum(n) - n
+        sorted_y = y[order]
 
-            if t > 0:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            bins[name + "_mean"] = np.bincount(idx, weights=y, minlength=len(n)) / n
 
-                cond0 = money_t == -1
-                cond1 = money_time_line[t-1] != -1
-                interruptions += cond0 * cond1
+        for q in (25, 50, 75):
+            k = start + np.floor(q / 100 * np.maximum(n - 1, 0)).astype(int)
+            bins["{}_q{}".format(name, q)] = np.where(n > 0, sorted_y[np.minimum(k, len(y) - 1)], np.nan)
 
-        return MoneyAnalysis(
-            m0=money[0],
-            m1=money[1],
-            m2=money[2],
-            interruptions=interruptions)
+        bins[name + "_counts"] = counts
+        bins[name + "_x_edges"] = x_edges
+        bins[name + "_y_edges"] = y_edges
 
+    # Figure can be redrawn (e.g. with another style) without the data
+    os.makedirs(bins_folder, exist_ok=True)
+    np.savez("{}{}.npz".format(bins_folder, data.file_name), **bins)
 
-def plot(data):
+    return bins
+
+
+def load_bins(file_name):
+
+    with np.load("{}{}.npz".format(bins_folder, file_name)) as f:
+        return dict(f)
+
+
+def plot_bins(bins, file_name):
+
+    import matplotlib.pyplot as plt
+    import matplotlib.colors
+
+    fig = plt.figure(figsize=(10, 10))
+
+    for i, (name, (label, f)) in enumerate(binned_variables.items()):
+
+        ax = fig.add_subplot(221 + i)
+
+        x_edges = bins[name + "_x_edges"]
+        counts = bins[name + "_counts"]
+        ax.pcolormesh(x_edges, bins[name + "_y_edges"], counts.T, cmap="Greys",
+                      norm=matplotlib.colors.LogNorm(vmin=1, vmax=max(1, counts.max())))
+
+        centers = (x_edges[:-1] + x_edges[1:]) / 2
+        ax.fill_between(centers, bins[name + "_q25"], bins[name + "_q75"], color="C0", alpha=0.3, linewidth=0)
+        ax.plot(centers, bins[name + "_mean"], color="C0")
+
+        ax.set_ylabel("n monetary states")
+        ax.set_xlabel(label)
+
+    fig.text(0.005, 0.005, "{} ({} runs)".format(file_name, int(bins["n"])),
+             fontsize='x-small', color='0.5')
+
+    plt.tight_layout()
+
+    file_path = "figures/{}/{}_summary.pdf".format(file_name, file_name)
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    plt.savefig(file_path)
+    plt.close(fig)
+
+
+def plot(data, binned=None):
+
+    if binned is None:
+        binned = len(data.data) > scatter_limit
+
+    if binned:
+        plot_bins(bin_pool(data), data.file_name)
+        return
+
+    # Not imported at module level: the catalog and the pipeline only need the summaries
+    import matplotlib.pyplot as plt
 
     class X(enum.Enum):
         alpha = enum.auto()
@@ -104,13 +161,7 @@ def plot(data):
     }
     y = []
 
-    for d in data.data:
-
-        a = MoneyAnalyst.run(
-            t_max=data.parameters.t_max,
-            direct_exchange=d.direct_exchanges_proportions,
-            indirect_exchange=d.indirect_exchanges_proportions
-        )
+    for d, a in zip(data.data, get_summaries(data.data)):
 
         x[X.vision_area].append(d.parameters.vision_area)
         x[X.tau].append(d.parameters.tau)
@@ -0,0 +1,74 @@
+import subprocess
+import argparse
+import tempfile
+import sys
+import os
+
+
+heavy_modules = ("matplotlib", "tqdm", "sqlite3", "asyncio")
+
+# Maximum import time (seconds) and modules that must not be loaded ('main' needs asyncio and sqlite3)
+import_limits = {
+    "model": (0.5, heavy_modules),
+    "main": (1., ("matplotlib", "tqdm"))
+}
+
+
+def import_time(module, n=5):
+
+    code = \
+        "import sys, time\n" \
+        "t0 = time.perf_counter()\n" \
+        "import {}\n" \
+        "print(time.perf_counter() - t0)\n" \
+        "print(' '.join(m for m in {} if m in sys.modules))\n".format(module, heavy_modules)
+
+    root = os.path.dirname(os.path.abspath(__file__))
+
+    times = []
+    for _ in range(n):
+
+        # Empty working directory, to detect files created at import
+        with tempfile.TemporaryDirectory() as cwd:
+            out = subprocess.run(
+                [sys.executable, "-c", code], cwd=cwd, env=dict(os.environ, PYTHONPATH=root),
+                stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout.split("\n")
+            created = os.listdir(cwd)
+
+        times.append(float(out[0]))
+
+    return min(times), out[1].split(), created
+
+
+def main():
+
+    failed = False
+
+    for module, (limit, forbidden) in import_limits.items():
+
+        t, loaded, created = import_time(module)
+
+        print("import {}: {:.3f}s (limit: {:.3f}s)".format(module, t, limit))
+
+        if t > limit:
+            failed = True
+            print("  too slow")
+
+        loaded = [m for m in loaded if m in forbidden]
+        if loaded:
+            failed = True
+            print("  loads {}".format(", ".join(loaded)))
+
+        if created:
+            failed = True
+            print("  creates {}".format(", ".join(created)))
+
+    return failed
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Check that import times do not regress.')
+    parser.parse_args()
+
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import argparse
+import json
+
+import sweep.client
+
+
+def main(parameters_file, output, plot):
+
+    with open(parameters_file, "r") as f:
+        parameters = json.load(f)
+
+    def progress(t):
+        print("t = {}/{}".format(t + 1, parameters["t_max"]), end="\r")
+
+    r = sweep.client.request(parameters, output=output, progress=progress)
+
+    print()
+    for k, v in r.items():
+        print("{}: {}".format(k, v))
+
+    if plot:
+
+        # Heavy imports only when needed
+        import pickle
+        import analysis.separate
+
+        with open(r["file_name"], "rb") as f:
+            analysis.separate.plot_indirect_exchanges(data=pickle.load(f))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Run a single simulation on the service started by main.py --serve.')
+    parser.add_argument('-p', '--parameters', type=str, default="parameters/parameters_single.json",
+                        help="Parameters file")
+    parser.add_argument('-o', '--output', type=str, default="full",
+                        help="'summary', 'series' or 'full'")
+    parser.add_argument('--plot', action="store_true", default=False,
+                        help="Plot the indirect exchanges")
+    parsed_args = parser.parse_args()
+
+    main(parsed_args.parameters, parsed_args.output, parsed_args.plot)
@@ -1,17 +1,39 @@
-import multiprocessing
-import tqdm
+import argparse
+
+import sweep.threads
+
+# Native libraries read their number of threads when NumPy is imported: '--threads' is applied before
+# (and inherited by the workers)
+if __name__ == "__main__":
+    _early_parser = argparse.ArgumentParser(add_help=False)
+    _early_parser.add_argument('-t', '--threads', type=int, default=1)
+    sweep.threads.limit_threads(_early_parser.parse_known_args()[0].threads)
+
 import numpy as np
 import os
 import shutil
 import json
-import argparse
 import glob
 import pickle
+import time
+import datetime
+import asyncio
 
 import model
 
 import analysis.separate
 import analysis.summary
+import analysis.catalog
+import analysis.pipeline
+
+import sweep.cache
+import sweep.journal
+import sweep.output
+import sweep.schedule
+import sweep.workers
+import sweep.distributed
+import sweep.supervisor
+import sweep.service
 
 parameters_folder = "parameters"
 template_folder = "template"
@@ -21,8 +43,36 @@ parameters_files = {
 }
 
 
-def run(parameters, multi=True):
-    return model.run(multi=multi, **parameters)
+def run(parameters, multi=True, maps_file=None, callback=None, **options):
+    return model.run(multi=multi, maps_file=maps_file, callback=callback, **options, **parameters)
+
+
+def run_indexed(args, callback=None):
+
+    i, parameters, output, maps_file, key = args
+
+    # Summary only: statistics are computed along the run, and series are never stored
+    options = {}
+    if output == sweep.output.Output.SUMMARY:
+        options = dict(statistics=model.statistics.OnlineStatistics(), series=False)
+
+    # Maps are only recorded if kept
+    if output < sweep.output.Output.FULL:
+        options["maps"] = False
+
+    t0 = time.time()
+    r = run(parameters, maps_file=maps_file, callback=callback, **options)
+    r.duration = time.time() - t0
+
+    # The worker persists the result, and only sends back what is needed
+    r = sweep.output.reduce(r, output)
+    sweep.cache.Cache().save(key, r, output)
+
+    return i, r
+
+
+def run_batch(task):
+    return [run_indexed(args) for args in task]
 
 
 def prepare():
@@ -35,57 +85,189 @@ def prepare():
             break
 
 
-def produce_data_pool():
+def load_parameters_pool():
 
     with open(parameters_files["pool"], "r") as f:
-        pp = model.data_structure.ParametersPool(**json.load(f))
+        return model.data_structure.ParametersPool(**json.load(f))
 
-    np.random.seed(pp.seed)
 
-    parameters_list = []
+def generate_parameters(pp):
 
-    seeds = np.random.randint(0, 2**32-1, size=pp.n)
+    parameters_list = []
 
     for i in range(pp.n):
 
-        x = np.random.randint(pp.x_min, pp.x_max + 1)
+        # Each run has its own streams, derived from the pool seed and its index,
+        # so that increasing 'n' keeps the previous runs unchanged
+        parameters_seed, seed = model.seeding.run_seed_sequences(pp.seed, i)
+        rng = np.random.default_rng(parameters_seed)
+
+        x = rng.integers(pp.x_min, pp.x_max + 1)
 
         parameters_list.append(
             model.data_structure.Parameters(
                 x0=x,
                 x1=x,
                 x2=x,
-                stride=np.random.randint(pp.stride_min, pp.stride_max + 1),
-                movement_area=np.random.randint(
+                stride=rng.integers(pp.stride_min, pp.stride_max + 1),
+                movement_area=rng.integers(
                     pp.movement_area_min, pp.movement_area_max + 1),
-                vision_area=np.random.randint(
+                vision_area=rng.integers(
                     pp.vision_area_min, pp.vision_area_max + 1
                 ),
-                alpha=np.random.uniform(
-                  pp.alpha_min, pp.alpha_max
+                # Bounds may be given in any order (Generator refuses high < low)
+                alpha=rng.uniform(
+                  *sorted((pp.alpha_min, pp.alpha_max))
                 ),
-                tau=np.random.uniform(
-                    pp.tau_min, pp.tau_max
+                tau=rng.uniform(
+                    *sorted((pp.tau_min, pp.tau_max))
                 ),
                 map_width=pp.map_width,
                 map_height=pp.map_height,
                 t_max=pp.t_max,
-                seed=seeds[i],
-                graphics=pp.graphics
+                seed=model.seeding.seed_to_int(seed),
+                graphics=pp.graphics,
+                counter_rng=pp.counter_rng,
+                window=pp.window,
+                pyramid=pp.pyramid
             ).__dict__
         )
 
-    pool = multiprocessing.Pool()
+    return parameters_list
 
-    backups = []
 
-    for bkp in tqdm.tqdm(
-            pool.imap_unordered(run, parameters_list),
-            total=pp.n):
-        backups.append(bkp)
+def produce_data_pool(force=False, resume=False, address=None, thread_cost=None, analyse=False, **options):
+
+    # 'options' are given to the supervisor of the local workers
+
+    journal = sweep.journal.Journal.latest() if resume else None
+
+    if journal is not None:
+        print("Resuming sweep '{}'".format(journal.name))
+        pp = model.data_structure.ParametersPool(**journal.parameters)
+
+    else:
+        pp = load_parameters_pool()
+        journal = sweep.journal.Journal.new(pp.__dict__)
+
+    parameters_list = generate_parameters(pp)
+
+    output = sweep.output.Output.get(pp.output)
+
+    cache = sweep.cache.Cache()
+    keys = [cache.key(p) for p in parameters_list]
+
+    to_run = []
+    cached = []
+    for i in range(pp.n):
+        if journal.done.get(i) == keys[i] and cache.contains(keys[i], output):
+            continue
+        elif not force and cache.contains(keys[i], output):
+            cached.append((i, keys[i]))
+        else:
+            # Maps are written by the worker next to the cache entry
+            maps_file = cache.maps_file(keys[i]) if output == sweep.output.Output.FULL else None
+            to_run.append((i, parameters_list[i], output, maps_file, keys[i]))
+
+    # Runs found in the cache are journaled at once
+    if cached:
+        journal.record(cached)
+
+    print("{} runs done, {} runs to simulate".format(pp.n - len(to_run), len(to_run)))
+
+    if to_run:
+
+        catalog = analysis.catalog.Catalog()
+
+        # Longest runs first, tiny runs fused together or (locally) run in threads
+        scheduler = sweep.schedule.Scheduler(
+            cost_model=sweep.schedule.CostModel.calibrate(catalog),
+            n_workers=options.get("n_workers") or os.cpu_count(),
+            thread_cost=thread_cost if address is None else None)
+        process_runs, thread_runs = scheduler.split(to_run)
+        tasks, task_costs = scheduler.schedule(process_runs)
+
+        print("Projected duration: {}".format(
+            datetime.timedelta(seconds=int(scheduler.projected_duration(task_costs, thread_runs)))))
+
+        # Figures are drawn while the remaining runs go on
+        pipeline = analysis.pipeline.Pipeline(journal.name, pp) if analyse else None
+
+        import tqdm
+        progress = tqdm.tqdm(total=len(to_run))
+
+        # Each run is persisted as soon as it is done, and not kept in memory
+        def on_results(results):
+            for i, bkp in results:
+                catalog.insert(bkp, file_name=cache.path(keys[i], output))
+                if pipeline is not None:
+                    pipeline.put(i, bkp)
+            journal.record((i, keys[i]) for i, bkp in results)
+            progress.update(len(results))
+
+        try:
+            if address is None:
+                supervisor = sweep.supervisor.Supervisor(run_batch, **options)
+
+                def on_results_with_throughput(results):
+                    on_results(results)
+                    progress.set_postfix(supervisor.throughput(), refresh=False)
+
+                # Runs of a task are executed one after the other
+                tasks_memory = [max(sweep.workers.estimate_memory(r[1], output) for r in t) for t in tasks]
+                asyncio.run(supervisor.run(tasks, tasks_memory, on_results_with_throughput, thread_runs))
+
+            else:
+                # Workers are launched separately with '--worker'
+                coordinator = sweep.distributed.Coordinator(address)
+                try:
+                    for results in coordinator.imap_unordered(tasks):
+                        # Workers may not share the data folder: results are kept in this one's cache
+                        for i, bkp in results:
+                            if not cache.contains(keys[i], output):
+                                cache.save(keys[i], bkp, output)
+                        on_results(results)
+                finally:
+                    coordinator.close()
+
+        except KeyboardInterrupt:
+            # Workers are already stopped; runs done are in the journal
+            progress.close()
+            if pipeline is not None:
+                pipeline.terminate()
+            raise SystemExit("Interrupted after {} of {} runs, use '--resume' to continue".format(
+                progress.n, len(to_run)))
+
+        progress.close()
+
+        if pipeline is not None:
+            pipeline.close()
+
+    # Never evicted below, even if the sweep alone is bigger than the cache
+    sweep_keys = set(keys)
+
+    if len(journal.done) < pp.n:
+        # Journal is left open
+        print("{} runs failed, use '--resume' to retry them".format(pp.n - len(journal.done)))
+        keys = [k for i, k in enumerate(keys) if i in journal.done]
+
+    else:
+        journal.close()
+
+    r = model.data_structure.ResultPool(data=[cache.load(k, output) for k in keys], parameters=pp)
+    r.file_name = journal.name
+
+    # An incomplete pool is analysed but not saved, so that it is not reused as is
+    if journal.complete:
+        r.save()
+
+    evicted = cache.evict(keep=sweep_keys)
+    if evicted:
+        catalog = analysis.catalog.Catalog()
+        catalog.forget(evicted)
+        catalog.close()
+        print("{} runs evicted from the cache".format(len(evicted)))
 
-    r = model.data_structure.ResultPool(data=backups, parameters=pp)
-    r.save()
     return r
 
 
@@ -96,20 +278,49 @@ def produce_data_single():
 
     r = run(parameters, multi=False)
     r.save()
+    analysis.catalog.Catalog().insert(r)
 
     return r
 
 
-def main_pool(force):
+def maps_evicted(r):
 
-    if not (os.path.exists("data/pickle") and glob.glob("data/pickle/pool*")) or force:
-        r = produce_data_pool()
+    # Maps and pyramid levels are only kept with the full output
+    if sweep.output.Output.get(getattr(r.parameters, "output", "full")) < sweep.output.Output.FULL:
+        return False
 
-    else:
+    return any((d.parameters.graphics and any(getattr(d, k) is None for k in d.maps)) or
+               (d.pyramid is not None and not d.pyramid.complete) for d in r.data)
+
+
+def main_pool(force, resume, address=None, **options):
+
+    r = None
+
+    if os.path.exists("data/pickle") and glob.glob("data/pickle/pool*") and not (force or resume):
         data_file = sorted(glob.glob("data/pickle/pool*"))[-1]
         with open(data_file, "rb") as f:
             r = pickle.load(f)
 
+        # If the sweep has been modified since, only new or changed runs are simulated (others are in cache)
+        if r.parameters.__dict__ != load_parameters_pool().__dict__:
+            r = None
+
+        # Same if maps of the pool have been evicted from the cache since
+        elif maps_evicted(r):
+            print("Maps of '{}' have been evicted from the cache".format(data_file))
+            r = None
+
+        # Or if it was produced by another version of the simulation or of the summaries
+        elif any(getattr(d, "summary", None) is not None and d.summary.version != model.version.fingerprint()
+                 for d in r.data):
+            print("'{}' was produced by another version of the code".format(data_file))
+            r = None
+
+    if r is None:
+        r = produce_data_pool(force=force, resume=resume, address=address, analyse=True, **options)
+
+    # Figures drawn during the sweep are up to date, and skipped
     analysis.separate.plot_indirect_exchanges(data=r)
     analysis.summary.plot(data=r)
 
@@ -139,9 +350,45 @@ if __name__ == "__main__":
                         help="Run single simulation")
     parser.add_argument('-f', '--force', action="store_true", default=False,
                         help="Run simulations even if data already exist")
+    parser.add_argument('-r', '--resume', action="store_true", default=False,
+                        help="Resume the last interrupted pool of simulations")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Number of worker processes (default: number of cores)")
+    parser.add_argument('-t', '--threads', type=int, default=1,
+                        help="Maximum number of native threads per worker")
+    parser.add_argument('-a', '--affinity', action="store_true", default=False,
+                        help="Pin each worker to a CPU")
+    parser.add_argument('-m', '--memory', type=float, default=None,
+                        help="Memory budget for the workers in GB (default: 80%% of the physical memory)")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="Maximum duration of a simulation in seconds")
+    parser.add_argument('--run-memory', type=float, default=None,
+                        help="Maximum memory of a worker in GB")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="Number of retries of a failed simulation")
+    parser.add_argument('--thread-cost', type=float, default=0.05,
+                        help="Simulations expected to last less (in seconds) are run in threads")
+    parser.add_argument('-d', '--distributed', type=str, default=None, metavar="HOST:PORT",
+                        help="Serve the pool of simulations to distributed workers")
+    parser.add_argument('--worker', type=str, default=None, metavar="HOST:PORT",
+                        help="Run simulations for the coordinator at this address")
+    parser.add_argument('--serve', action="store_true", default=False,
+                        help="Keep workers ready for the simulations requested with 'client.py'")
     parsed_args = parser.parse_args()
 
-    if parsed_args.single:
+    if parsed_args.serve:
+        sweep.service.Service(run_indexed, n_workers=parsed_args.workers).serve_forever()
+    elif parsed_args.worker is not None:
+        sweep.distributed.work(parsed_args.worker, run_batch,
+                               n_workers=parsed_args.workers, threads=parsed_args.threads)
+    elif parsed_args.single:
         main_single(parsed_args.force)
     else:
-        main_pool(parsed_args.force)
+        main_pool(
+            parsed_args.force, parsed_args.resume, address=parsed_args.distributed,
+            thread_cost=parsed_args.thread_cost,
+            n_workers=parsed_args.workers, threads=parsed_args.threads, affinity=parsed_args.affinity,
+            memory_budget=parsed_args.memory * 2**30 if parsed_args.memory is not None else None,
+            timeout=parsed_args.timeout,
+            memory_limit=parsed_args.run_memory * 2**30 if parsed_args.run_memory is not None else None,
+            retries=parsed_args.retries)
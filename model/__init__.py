@@ -1,3 +1,13 @@
 from . model import Model
 from . run import run
 from . data_structure import ParametersPool
+
+
+def __getattr__(name):
+
+    # The asynchronous API is only imported when used, 'import model' loads nothing but NumPy
+    if name in ("run_async", "sweep_async", "Executor"):
+        from . import asynchronous
+        return getattr(asynchronous, name)
+
+    raise AttributeError("module 'model' has no attribute '{}'".format(name))
@@ -0,0 +1,152 @@
+import multiprocessing
+import functools
+import asyncio
+import signal
+
+from . run import run
+
+
+def _work(conn):
+
+    # Interruptions are handled by the parent
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while True:
+
+        parameters = conn.recv()
+        if parameters is None:
+            break
+
+        try:
+            r = run(multi=True, callback=lambda t: conn.send(("progress", t)), **parameters)
+            conn.send(("result", r))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+
+
+async def recv(conn):
+
+    # Wait for a message without blocking the event loop
+    loop = asyncio.get_running_loop()
+    readable = loop.create_future()
+
+    fd = conn.fileno()
+    loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+    try:
+        await readable
+    finally:
+        loop.remove_reader(fd)
+
+    return conn.recv()
+
+
+class Executor:
+
+    def __init__(self, n_workers=None):
+
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+
+        # Workers are started on first use; 'None' is a slot without worker
+        self.idle = None
+        self.loop = None
+
+    def _start(self):
+
+        conn, child_conn = multiprocessing.Pipe()
+        p = multiprocessing.Process(target=_work, args=(child_conn, ), daemon=True)
+        p.start()
+        child_conn.close()
+        return p, conn
+
+    async def _acquire(self):
+
+        if self.loop is not asyncio.get_running_loop():
+            # Queue is bound to an event loop
+            workers = [] if self.idle is None else [self.idle.get_nowait() for _ in range(self.idle.qsize())]
+            self.loop = asyncio.get_running_loop()
+            self.idle = asyncio.Queue()
+            for w in workers + [None, ] * (self.n_workers - len(workers)):
+                self.idle.put_nowait(w)
+
+        w = await self.idle.get()
+        if w is None or not w[0].is_alive():
+            w = self._start()
+        return w
+
+    async def run(self, parameters, progress=None):
+
+        p, conn = await self._acquire()
+
+        try:
+            conn.send(parameters)
+
+            while True:
+                kind, content = await recv(conn)
+                if kind != "progress":
+                    break
+                if progress is not None:
+                    progress(content)
+
+        except BaseException:
+            # Cancelled (or connection lost) in the middle of a simulation: worker is stopped
+            p.kill()
+            p.join()
+            conn.close()
+            self.idle.put_nowait(None)
+            raise
+
+        self.idle.put_nowait((p, conn))
+
+        if kind == "error":
+            raise RuntimeError(content)
+        return content
+
+    def close(self):
+
+        while self.idle is not None and not self.idle.empty():
+            w = self.idle.get_nowait()
+            if w is not None:
+                w[0].kill()
+                w[0].join()
+
+
+_executor = None
+
+
+def get_executor():
+
+    global _executor
+    if _executor is None:
+        _executor = Executor()
+    return _executor
+
+
+async def run_async(parameters, progress=None, executor=None):
+
+    # 'parameters' are the keyword arguments of 'run'; 'progress' is called with each t
+    executor = executor or get_executor()
+    return await executor.run(parameters, progress=progress)
+
+
+async def sweep_async(parameters_list, progress=None, executor=None):
+
+    # Yield (index, result) as soon as each run is done; 'progress' is called with (index, t)
+    executor = executor or get_executor()
+
+    pending = {
+        asyncio.ensure_future(executor.run(
+            p, progress=functools.partial(progress, i) if progress is not None else None)): i
+        for i, p in enumerate(parameters_list)
+    }
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for f in done:
+                yield pending.pop(f), f.result()
+
+    finally:
+        # Leaving the loop early cancels the remaining runs
+        for f in pending:
+            f.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
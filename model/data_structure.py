@@ -1,13 +1,22 @@
+import numpy as np
 import datetime
 import pickle
 import json
 import os
 
+from . version import fingerprint
+
 
 class Parameters:
 
+    # Parameters pickled by a previous version
+    counter_rng = False
+    window = None
+    pyramid = False
+
     def __init__(self, vision_area, movement_area, stride, x0, x1, x2,
-                 alpha, tau, map_width, map_height, t_max, seed, graphics):
+                 alpha, tau, map_width, map_height, t_max, seed, graphics, counter_rng=False, window=None,
+                 pyramid=False):
         self.x0 = x0
         self.x1 = x1
         self.x2 = x2
@@ -21,6 +30,9 @@ class Parameters:
         self.t_max = t_max
         self.seed = seed
         self.graphics = graphics
+        self.counter_rng = counter_rng
+        self.window = window
+        self.pyramid = pyramid
 
 
 class ParametersPool:
@@ -29,7 +41,8 @@ class ParametersPool:
                  alpha_min, alpha_max, tau_min, tau_max,
                  movement_area_min, movement_area_max,
                  vision_area_min, vision_area_max, x_min, x_max,
-                 stride_min, stride_max, n, seed, graphics):
+                 stride_min, stride_max, n, seed, graphics, output="full", counter_rng=False, window=None,
+                 pyramid=False):
         
         self.t_max = t_max
         self.map_height = map_height
@@ -49,29 +62,93 @@ class ParametersPool:
         self.n = n
         self.seed = seed
         self.graphics = graphics
+        self.output = output  # 'summary', 'series' or 'full'
+        self.counter_rng = counter_rng
+        self.window = window  # If given, series are only kept in bounded form
+        self.pyramid = pyramid  # Also record downsampled maps
+
+
+class Summary:
+
+    # Summaries pickled by a previous version
+    version = None
+
+    def __init__(self, m0, m1, m2, interruptions, convergence_time, direct_mean, indirect_mean):
+
+        # Version of the code that computed it (see 'model.version')
+        self.version = fingerprint()
+
+        self.m0 = m0
+        self.m1 = m1
+        self.m2 = m2
+        self.interruptions = interruptions
+        self.convergence_time = convergence_time
+        self.direct_mean = direct_mean
+        self.indirect_mean = indirect_mean
 
 
 class Result:
 
+    maps = ("agent_maps", "exchange_maps")
+
+    # Results pickled by a previous version
+    direct_series = None
+    indirect_series = None
+    pyramid = None
+
     data_folder = "data/"
     pickle_folder = data_folder + "pickle/"
     json_folder = data_folder + "json/"
-    for f in (pickle_folder, json_folder):
-        os.makedirs(f, exist_ok=True)
 
     def __init__(self, direct_exchanges_proportions, indirect_exchanges_proportions,
-                 exchange_maps, agent_maps, parameters):
+                 exchange_maps, agent_maps, parameters, summary=None,
+                 direct_series=None, indirect_series=None, pyramid=None):
 
         self.direct_exchanges_proportions = direct_exchanges_proportions
         self.indirect_exchanges_proportions = indirect_exchanges_proportions
         self.exchange_maps = exchange_maps
         self.agent_maps = agent_maps
         self.parameters = parameters
+        self.summary = summary
+        self.direct_series = direct_series  # 'SeriesRecorder's
+        self.indirect_series = indirect_series
+        self.pyramid = pyramid  # 'MapPyramid'
+        self.duration = None
         self.file_name = datetime.datetime.now().strftime("single_%y_%m_%d_%H_%M_%S_%f")
 
+    @property
+    def pickle_file(self):
+        return "{}{}.p".format(self.pickle_folder, self.file_name)
+
+    def __getstate__(self):
+
+        # Maps stored in a memmap are not copied, only their file name is pickled
+        # (relative to the working directory, as 'data/' is)
+        state = self.__dict__.copy()
+        for k in self.maps:
+            if getattr(state[k], "filename", None) is not None:
+                state[k] = os.path.relpath(state[k].filename)
+
+        return state
+
+    def __setstate__(self, state):
+
+        for k in self.maps:
+            if isinstance(state.get(k), str):
+                try:
+                    state[k] = np.load(state[k], mmap_mode="r")
+                except (OSError, ValueError, EOFError):
+                    print("Could not load '{}'".format(state[k]))
+                    state[k] = None
+
+        self.__dict__.update(state)
+
     def save(self):
 
-        with open("{}{}.p".format(self.pickle_folder, self.file_name), 'wb') as f:
+        for f in (self.pickle_folder, self.json_folder):
+            os.makedirs(f, exist_ok=True)
+
+        with open(self.pickle_file, 'wb') as f:
             pickle.dump(self, f)
 
         with open("{}{}.json".format(self.json_folder, self.file_name), 'w') as f:
@@ -83,8 +160,6 @@ class ResultPool:
     data_folder = "data/"
     pickle_folder = data_folder + "pickle/"
     json_folder = data_folder + "json/"
-    for f in (pickle_folder, json_folder):
-        os.makedirs(f, exist_ok=True)
 
     def __init__(self, data, parameters):
 
@@ -93,9 +168,16 @@ class ResultPool:
 
         self.file_name = datetime.datetime.now().strftime("pool_%y_%m_%d_%H_%M_%S_%f")
 
+    @property
+    def pickle_file(self):
+        return "{}{}.p".format(self.pickle_folder, self.file_name)
+
     def save(self):
 
-        file_name = "{}{}.p".format(self.pickle_folder, self.file_name)
+        for f in (self.pickle_folder, self.json_folder):
+            os.makedirs(f, exist_ok=True)
+
+        file_name = self.pickle_file
         try:
             with open(file_name, 'wb') as f:
                 pickle.dump(self, f)
@@ -1,6 +1,8 @@
 import numpy as np
 import itertools
 
+from . seeding import CounterStreams
+
 
 ############################################
 #           NOTATION                       #
@@ -87,7 +89,16 @@ class Model:
         [4, 5, 2, 3]], dtype=int)
 
     def __init__(self, vision_area=5, movement_area=5, stride=1, x0=10, x1=10, x2=10,
-                 alpha=0.1, tau=0.05, map_width=20, map_height=2):
+                 alpha=0.1, tau=0.05, map_width=20, map_height=2, rng=None, streams=None):
+
+        # Each model has its own random generator, so that several can run in the same process
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        # If given, draws are taken from streams keyed by step, agent and purpose instead
+        self.streams = streams
+
+        self.t = 0  # Current step
+        self.current = 0  # Agent currently looking for a partner
 
         # Get parameters
 
@@ -160,10 +171,21 @@ class Model:
         # '1' means each type of exchange can be expected to be realized in only one unit of time
         # The more the value is close to zero, the more an exchange is expected to be hard.
         #
-        self.estimation[:] = np.random.random((self.n, 4))
+        if self.streams is None:
+            self.estimation[:] = self.rng.random((self.n, 4))
+        else:
+            for idx in range(self.n):
+                self.estimation[idx] = self.stream(CounterStreams.INIT, idx).random(4)
 
         self.setup()
 
+    def stream(self, purpose, idx=0, other=None):
+
+        if self.streams is None:
+            return self.rng
+
+        return self.streams.get(self.t, purpose, idx, idx if other is None else other)
+
     # --------------------------------------------------||| SETUP |||----------------------------------------------- #
 
     def setup(self):
@@ -173,13 +195,16 @@ class Model:
 
     def setup_insert_agents_on_map(self):
 
-        random_order = np.random.permutation(range(self.n))
+        # Placement is sequential by nature: a single stream
+        rng = self.stream(CounterStreams.SETUP)
+
+        random_order = rng.permutation(self.n)
 
         for idx in random_order:
 
             while True:
-                x = np.random.randint(0, self.map_width)
-                y = np.random.randint(0, self.map_height)
+                x = rng.integers(0, self.map_width)
+                y = rng.integers(0, self.map_height)
 
                 if self.agent_map[x, y] == -1:
                     self.position[idx] = x, y
@@ -255,7 +280,7 @@ class Model:
 
         assert type(idx) in (np.int64, int)
 
-        np.random.shuffle(positions_in_map)
+        self.stream(CounterStreams.MOVE, idx).shuffle(positions_in_map)
 
         for x, y in positions_in_map:
 
@@ -275,6 +300,8 @@ class Model:
 
         # print("Encounter:", idx, "\n")
 
+        self.current = idx
+
         occupied_nearby_positions = self.encounter_check_nearby_positions(idx)
         group_idx = self.encounter_look_for_partners(occupied_nearby_positions)
 
@@ -357,7 +384,7 @@ class Model:
 
         if partner_ids:
 
-            partner_id = np.random.choice(partner_ids)
+            partner_id = self.stream(CounterStreams.PARTNER, idx).choice(partner_ids)
         else:
             partner_id = -1  # Partner_id must be an int, therefore we give it an unlikely
             # value in case the agent doesn't have a partner
@@ -474,7 +501,7 @@ class Model:
             1 / \
             (1 + np.exp(- (self.value_option0[idx] - self.value_option1[idx]) / self.tau))
 
-        random_number = np.random.random()  # Generate random number
+        random_number = self.stream(CounterStreams.CHOICE, self.current, idx).random()  # Generate random number
 
         # Make a choice using the probability of choosing option 0 and a random number for each agent
         # Choose option 1 if random number > or = to probability of choosing option 0,
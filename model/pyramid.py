@@ -0,0 +1,112 @@
+import numpy as np
+import os
+
+
+class MapPyramid:
+
+    def __init__(self, t_max, map_width, map_height, agent_type, factor=4, min_size=8, maps_file=None):
+
+        # Level k gives, for blocks of factor**k x factor**k cells, the number of agents of each type
+        # and the sum of the exchanges (level 0 is the maps themselves)
+        self.factor = factor
+        self.agent_type = np.concatenate(([-1], agent_type))  # Type of agent id + 1 (-1 for an empty cell)
+        self.maps_file = maps_file
+
+        self.shapes = []
+        w, h = map_width, map_height
+        while max(w, h) > min_size:
+            w, h = -(-w // factor), -(-h // factor)
+            self.shapes.append((w, h))
+
+        self.type_counts = [self._new(k, "type_counts", (t_max, 3) + s) for k, s in enumerate(self.shapes, 1)]
+        self.exchange_sums = [self._new(k, "exchange_sums", (t_max, 3) + s) for k, s in enumerate(self.shapes, 1)]
+
+    def _new(self, level, name, shape):
+
+        if self.maps_file is None:
+            return np.zeros(shape, dtype=np.int32)
+
+        # Like the maps, written on disk (under a temporary name until complete)
+        return np.lib.format.open_memmap(
+            "{}_pyramid_{}_{}.npy.tmp".format(self.maps_file, level, name), mode="w+", dtype=np.int32, shape=shape)
+
+    @property
+    def n_levels(self):
+        return len(self.shapes)
+
+    def block_size(self, level):
+        return self.factor ** level
+
+    def _reduce(self, a, shape):
+
+        # Sum over blocks of 'factor' x 'factor' (last axes), padding with zeros if needed
+        w, h = shape
+        f = self.factor
+        padded = np.zeros(a.shape[:-2] + (w * f, h * f), dtype=a.dtype)
+        padded[..., :a.shape[-2], :a.shape[-1]] = a
+        return padded.reshape(a.shape[:-2] + (w, f, h, f)).sum(axis=(-3, -1))
+
+    def record(self, t, agent_map, exchange_map):
+
+        types = self.agent_type[agent_map + 1]
+        one_hot = (types == np.arange(3)[:, None, None]).astype(np.int32)
+        exchanges = exchange_map.astype(np.int32)
+
+        # Each level from the previous one
+        for k, shape in enumerate(self.shapes):
+            one_hot = self._reduce(one_hot, shape)
+            exchanges = self._reduce(exchanges, shape)
+            self.type_counts[k][t] = one_hot
+            self.exchange_sums[k][t] = exchanges
+
+    def close(self):
+
+        if self.maps_file is None:
+            return
+
+        # Files only get their final name once complete
+        for arrays in (self.type_counts, self.exchange_sums):
+            for k, m in enumerate(arrays):
+                m.flush()
+                name = m.filename[:-len(".tmp")]
+                os.replace(m.filename, name)
+                arrays[k] = np.load(name, mmap_mode="r")
+
+    def level(self, level):
+
+        # Type counts and exchange sums at this level, with the size of the blocks
+        return self.type_counts[level - 1], self.exchange_sums[level - 1], self.block_size(level)
+
+    def cells(self, level, i, j):
+
+        # Cells of block (i, j) of a level, e.g. to zoom on the maps at full resolution
+        b = self.block_size(level)
+        return slice(i * b, (i + 1) * b), slice(j * b, (j + 1) * b)
+
+    def __getstate__(self):
+
+        # Arrays stored in a memmap are not copied, only their file name (relative, like the maps) is pickled
+        state = self.__dict__.copy()
+        for k in ("type_counts", "exchange_sums"):
+            state[k] = [os.path.relpath(m.filename) if getattr(m, "filename", None) else m for m in state[k]]
+        return state
+
+    def __setstate__(self, state):
+
+        for k in ("type_counts", "exchange_sums"):
+            state[k] = [self._load(m) if isinstance(m, str) else m for m in state[k]]
+        self.__dict__.update(state)
+
+    @staticmethod
+    def _load(file_name):
+
+        # Like the maps, a level evicted from the cache is None
+        try:
+            return np.load(file_name, mmap_mode="r")
+        except (OSError, ValueError, EOFError):
+            print("Could not load '{}'".format(file_name))
+            return None
+
+    @property
+    def complete(self):
+        return all(m is not None for m in self.type_counts + self.exchange_sums)
@@ -1,15 +1,25 @@
 import numpy as np
-import tqdm
+import os
 
-from . import model, data_structure
+from . import model, data_structure, seeding, timeseries
+from . pyramid import MapPyramid
+from . statistics import OnlineStatistics
 
 
 def run(t_max=600, map_height=30, map_width=30,
         alpha=0.4, tau=0.01, movement_area=6, vision_area=15,
-        x0=65, x1=65, x2=65, stride=1, seed=np.random.randint(0, 2**32-1),
-        graphics=False, multi=False):
+        x0=65, x1=65, x2=65, stride=1, seed=None,
+        graphics=False, multi=False, maps_file=None, callback=None, counter_rng=False,
+        statistics=None, series=True, window=None, pyramid=False, maps=True):
 
-    np.random.seed(seed)
+    # A new seed at each call (and not once for all at import)
+    if seed is None:
+        seed = seeding.new_seed()
+
+    rng = np.random.default_rng(seed)
+
+    # Counter-based streams make the run independent of the order in which agents are processed
+    streams = seeding.CounterStreams(seed) if counter_rng else None
 
     # tqdm.tqdm_gui.write("Producing data...")
 
@@ -17,11 +27,24 @@ def run(t_max=600, map_height=30, map_width=30,
         map_height=map_height, map_width=map_width,
         x0=x0, x1=x1, x2=x2,
         vision_area=vision_area, movement_area=movement_area, stride=stride,
-        alpha=alpha, tau=tau
+        alpha=alpha, tau=tau, rng=rng, streams=streams
     )
 
-    direct_exchanges_proportions = np.zeros((t_max, 3))
-    indirect_exchanges_proportions = np.zeros((t_max, 3))
+    # With a window, series are only kept in bounded form (last steps and downsampled history)
+    if window is not None:
+        series = False
+        direct_series = timeseries.SeriesRecorder(window)
+        indirect_series = timeseries.SeriesRecorder(window)
+
+        # Summary can not be computed afterwards from bounded series: it is computed along the run
+        if statistics is None:
+            statistics = OnlineStatistics()
+    else:
+        direct_series = indirect_series = None
+
+    # Without series, only 'statistics' (updated at each step) is kept
+    direct_exchanges_proportions = np.zeros((t_max, 3)) if series else None
+    indirect_exchanges_proportions = np.zeros((t_max, 3)) if series else None
 
     idx = np.arange(eco.n, dtype=int)
 
@@ -31,24 +54,43 @@ def run(t_max=600, map_height=30, map_width=30,
     # Place agents and stuff...
     eco.setup()
 
-    if graphics:
+    # Without 'maps' (e.g. maps not kept in the output), graphics are not recorded at all
+    record_maps = graphics and maps
+
+    if record_maps:
 
-        agent_maps = np.zeros((t_max, map_width, map_height), dtype=int)
-        exchange_maps = np.zeros((t_max, 3, map_width, map_height), dtype=int)
+        if maps_file is None:
+            agent_maps = np.zeros((t_max, map_width, map_height), dtype=int)
+            exchange_maps = np.zeros((t_max, 3, map_width, map_height), dtype=int)
+
+        else:
+            # Maps are written directly on disk, and only their file names will be pickled
+            agent_maps = np.lib.format.open_memmap(
+                "{}_agent_maps.npy.tmp".format(maps_file), mode="w+",
+                dtype=int, shape=(t_max, map_width, map_height))
+            exchange_maps = np.lib.format.open_memmap(
+                "{}_exchange_maps.npy.tmp".format(maps_file), mode="w+",
+                dtype=int, shape=(t_max, 3, map_width, map_height))
 
         # Save initial positions
         agent_maps[0] = eco.agent_map
 
+    # Downsampled maps (recorded even without the maps themselves)
+    map_pyramid = MapPyramid(
+        t_max, map_width, map_height, eco.type, maps_file=maps_file) if pyramid and maps else None
+
     if multi:
         iterable = range(t_max)
     else:
+        import tqdm
         iterable = tqdm.tqdm(range(t_max))
 
     for t in iterable:
 
         eco.reset()
+        eco.t = t
 
-        np.random.shuffle(idx)
+        eco.stream(model.CounterStreams.ORDER).shuffle(idx)
 
         for i in idx:
 
@@ -60,11 +102,14 @@ def run(t_max=600, map_height=30, map_width=30,
         # -------------------- #
         # For saving...
         # ------------------- #
-        if graphics:
+        if record_maps:
 
             agent_maps[t] = eco.agent_map
             exchange_maps[t] = eco.exchange_map
 
+        if map_pyramid is not None:
+            map_pyramid.record(t, eco.agent_map, eco.exchange_map)
+
         # -----------------  #
 
         # ---------- #
@@ -73,8 +118,33 @@ def run(t_max=600, map_height=30, map_width=30,
         # for each "t" we compute the proportion of direct choices
         eco.compute_choices_proportions()
 
-        direct_exchanges_proportions[t, :] = eco.direct_choices_proportions
-        indirect_exchanges_proportions[t, :] = eco.indirect_choices_proportions
+        if series:
+            direct_exchanges_proportions[t, :] = eco.direct_choices_proportions
+            indirect_exchanges_proportions[t, :] = eco.indirect_choices_proportions
+
+        if window is not None:
+            direct_series.append(eco.direct_choices_proportions)
+            indirect_series.append(eco.indirect_choices_proportions)
+
+        if statistics is not None:
+            statistics.update(eco.direct_choices_proportions, eco.indirect_choices_proportions)
+
+        if callback is not None:
+            callback(t)
+
+    if record_maps and maps_file is not None:
+
+        # Files only get their final name once complete
+        maps = []
+        for m, name in ((agent_maps, "agent_maps"), (exchange_maps, "exchange_maps")):
+            m.flush()
+            os.replace(m.filename, "{}_{}.npy".format(maps_file, name))
+            maps.append(np.load("{}_{}.npy".format(maps_file, name), mmap_mode="r"))
+
+        agent_maps, exchange_maps = maps
+
+    if map_pyramid is not None:
+        map_pyramid.close()
 
     # Finally we compute the direct choices mean for each type
     # of agent and return it as well as the direct choices proportions
@@ -85,12 +155,16 @@ def run(t_max=600, map_height=30, map_width=30,
         t_max=t_max, map_height=map_height, map_width=map_width,
         x0=x0, x1=x1, x2=x2,
         vision_area=vision_area, movement_area=movement_area, stride=stride,
-        alpha=alpha, tau=tau, seed=seed, graphics=graphics
+        alpha=alpha, tau=tau, seed=seed, graphics=graphics, counter_rng=counter_rng,
+        window=window, pyramid=pyramid
     )
 
     return data_structure.Result(
         direct_exchanges_proportions=direct_exchanges_proportions,
         indirect_exchanges_proportions=indirect_exchanges_proportions,
         exchange_maps=exchange_maps, agent_maps=agent_maps,
-        parameters=parameters
+        parameters=parameters,
+        summary=statistics.summary() if statistics is not None else None,
+        direct_series=direct_series, indirect_series=indirect_series,
+        pyramid=map_pyramid
     )
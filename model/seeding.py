@@ -0,0 +1,45 @@
+import numpy as np
+
+
+def seed_to_int(seed_sequence):
+
+    # Below 2**63, so that it fits in the signed 64-bit integers of SQLite
+    return int(seed_sequence.generate_state(1, dtype=np.uint64)[0] >> np.uint64(1))
+
+
+def new_seed():
+    return seed_to_int(np.random.SeedSequence())
+
+
+def run_seed_sequences(root_seed, i, replica=0):
+
+    # Streams of run 'i' (replica 'replica') of a pool only depend on the root seed and on 'i',
+    # neither on the number of runs nor on the backend executing them.
+    # Returns the sequence for drawing the parameters and the one for the simulation itself.
+    return np.random.SeedSequence(root_seed, spawn_key=(i, replica)).spawn(2)
+
+
+class CounterStreams:
+
+    # Purposes of the draws
+    SETUP, ORDER, INIT, MOVE, PARTNER, CHOICE = range(6)
+    n_purposes = 6
+
+    def __init__(self, seed):
+
+        # One Philox generator, repositioned for each stream (much cheaper than creating one)
+        self.bit_generator = np.random.Philox(key=seed)
+        self.generator = np.random.Generator(self.bit_generator)
+        self.state = self.bit_generator.state
+
+    def get(self, t, purpose, idx=0, other=0):
+
+        # Stream keyed by (seed, t, idx, other, purpose): what an agent draws does not depend on
+        # the order in which agents are processed. First word of the counter is left for the
+        # successive draws inside the stream.
+        self.state["state"]["counter"][:] = 0, t, idx, other * self.n_purposes + purpose
+        self.state["buffer_pos"] = 4
+        self.state["has_uint32"] = 0
+        self.bit_generator.state = self.state
+
+        return self.generator
@@ -0,0 +1,257 @@
+import numpy as np
+
+from . data_structure import Summary
+from . version import fingerprint
+
+
+class MoneyAnalysis:
+
+    def __init__(self, m0, m1, m2, interruptions, convergence_time=None):
+
+        self.m0 = m0
+        self.m1 = m1
+        self.m2 = m2
+        self.interruptions = interruptions
+        self.convergence_time = convergence_time
+
+
+class MoneyAnalyst(object):
+
+    money_threshold = .75
+
+    # Runs summarized at once by 'summarize_pool' (bounds memory on big pools)
+    chunk_size = 4096
+
+    @classmethod
+    def states(cls, direct_exchange, indirect_exchange):
+
+        # Monetary state for every t (and every run if arrays are stacked): -1, 0, 1 or 2
+        direct = direct_exchange > cls.money_threshold
+        indirect = indirect_exchange > cls.money_threshold
+
+        # Money = 0: type '0' and '2' use direct exchange, type '1' uses indirect exchange
+        money0 = direct[..., 0] & indirect[..., 1] & direct[..., 2]
+        # Money = 1
+        money1 = direct[..., 0] & direct[..., 1] & indirect[..., 2]
+        # Money = 2
+        money2 = indirect[..., 0] & direct[..., 1] & direct[..., 2]
+
+        # First condition satisfied wins
+        return np.select([money0, money1, money2], [0, 1, 2], default=-1)
+
+    @classmethod
+    def run_many(cls, direct_exchange, indirect_exchange, lengths=None):
+
+        # Arrays of shape (n_runs, t_max, 3); runs shorter than t_max are given by 'lengths'
+        n_runs, t_max = direct_exchange.shape[:2]
+
+        if lengths is None:
+            lengths = np.full(n_runs, t_max)
+        lengths = np.asarray(lengths)
+
+        # Empty runs: one masked step keeps the reductions below well defined
+        if t_max == 0:
+            direct_exchange = indirect_exchange = np.zeros((n_runs, 1, 3))
+            t_max = 1
+
+        valid = np.arange(t_max) < lengths[:, None]
+
+        money_time_line = cls.states(direct_exchange, indirect_exchange)
+        money_time_line[~valid] = -1
+
+        m = [np.sum(money_time_line == k, axis=1) for k in range(3)]
+
+        # Going from a monetary state to none
+        interruptions = np.sum(
+            (money_time_line[:, 1:] == -1) & (money_time_line[:, :-1] != -1) & valid[:, 1:], axis=1)
+
+        # First t from which the final monetary state is never left (-1 if the final state is not monetary)
+        last = np.where(
+            lengths > 0, money_time_line[np.arange(n_runs), np.maximum(lengths - 1, 0)], -1)
+        changes = (money_time_line != last[:, None]) & valid
+        last_change = t_max - 1 - np.argmax(changes[:, ::-1], axis=1)
+        convergence_time = np.where(changes.any(axis=1), last_change + 1, 0)
+        convergence_time[last == -1] = -1
+
+        return MoneyAnalysis(
+            m0=m[0],
+            m1=m[1],
+            m2=m[2],
+            interruptions=interruptions,
+            convergence_time=convergence_time)
+
+    @classmethod
+    def run(cls, direct_exchange, indirect_exchange, t_max):
+
+        a = cls.run_many(
+            direct_exchange=np.asarray(direct_exchange)[None, :t_max],
+            indirect_exchange=np.asarray(indirect_exchange)[None, :t_max])
+
+        convergence_time = int(a.convergence_time[0])
+
+        return MoneyAnalysis(
+            m0=int(a.m0[0]),
+            m1=int(a.m1[0]),
+            m2=int(a.m2[0]),
+            interruptions=int(a.interruptions[0]),
+            convergence_time=convergence_time if convergence_time != -1 else None)
+
+
+class RunningMoments:
+
+    def __init__(self, size):
+
+        # Welford's algorithm
+        self.n = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def update(self, x):
+
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self):
+        return self.m2 / self.n if self.n else np.zeros(len(self.mean))
+
+
+class OnlineStatistics:
+
+    def __init__(self, window=50):
+
+        self.t = 0
+
+        self.direct = RunningMoments(3)
+        self.indirect = RunningMoments(3)
+
+        # Same semantics as 'MoneyAnalyst.run'
+        self.money = {0: 0, 1: 0, 2: 0, -1: 0}
+        self.interruptions = 0
+        self.state = None
+        self.state_since = 0  # Step from which the current state has not been left
+        self.first_money_time = None
+
+        # Last 'window' steps (ring buffers with running sums)
+        self.window = window
+        self.recent_direct = np.zeros((window, 3))
+        self.recent_indirect = np.zeros((window, 3))
+        self.recent_direct_sum = np.zeros(3)
+        self.recent_indirect_sum = np.zeros(3)
+
+    def update(self, direct, indirect):
+
+        state = int(MoneyAnalyst.states(direct, indirect))
+
+        self.money[state] += 1
+
+        if self.state is not None and state != self.state:
+            self.state_since = self.t
+            self.interruptions += state == -1
+
+        if state != -1 and self.first_money_time is None:
+            self.first_money_time = self.t
+
+        self.state = state
+
+        self.direct.update(direct)
+        self.indirect.update(indirect)
+
+        i = self.t % self.window
+        self.recent_direct_sum += direct - self.recent_direct[i]
+        self.recent_indirect_sum += indirect - self.recent_indirect[i]
+        self.recent_direct[i] = direct
+        self.recent_indirect[i] = indirect
+
+        self.t += 1
+
+    @property
+    def windowed_direct_mean(self):
+        return self.recent_direct_sum / max(1, min(self.t, self.window))
+
+    @property
+    def windowed_indirect_mean(self):
+        return self.recent_indirect_sum / max(1, min(self.t, self.window))
+
+    @property
+    def convergence_time(self):
+        return self.state_since if self.state not in (None, -1) else None
+
+    def summary(self):
+
+        return Summary(
+            m0=self.money[0], m1=self.money[1], m2=self.money[2],
+            interruptions=self.interruptions,
+            convergence_time=self.convergence_time,
+            direct_mean=self.direct.mean.copy(),
+            indirect_mean=self.indirect.mean.copy()
+        )
+
+
+def summarize(result):
+
+    a = MoneyAnalyst.run(
+        t_max=result.parameters.t_max,
+        direct_exchange=result.direct_exchanges_proportions,
+        indirect_exchange=result.indirect_exchanges_proportions
+    )
+
+    return Summary(
+        m0=a.m0, m1=a.m1, m2=a.m2,
+        interruptions=a.interruptions,
+        convergence_time=a.convergence_time,
+        direct_mean=np.mean(result.direct_exchanges_proportions, axis=0),
+        indirect_mean=np.mean(result.indirect_exchanges_proportions, axis=0)
+    )
+
+
+def summarize_pool(results):
+
+    # Same as 'summarize' for each result, with every run of a chunk analysed at once
+    summaries = []
+
+    for start in range(0, len(results), MoneyAnalyst.chunk_size):
+
+        chunk = results[start:start + MoneyAnalyst.chunk_size]
+
+        lengths = np.array([min(r.parameters.t_max, len(r.direct_exchanges_proportions)) for r in chunk])
+        t_max = lengths.max() if len(lengths) else 0
+
+        # Runs of different lengths are padded with zeros
+        direct = np.zeros((len(chunk), t_max, 3))
+        indirect = np.zeros((len(chunk), t_max, 3))
+        for i, r in enumerate(chunk):
+            direct[i, :lengths[i]] = r.direct_exchanges_proportions[:lengths[i]]
+            indirect[i, :lengths[i]] = r.indirect_exchanges_proportions[:lengths[i]]
+
+        a = MoneyAnalyst.run_many(direct, indirect, lengths)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            direct_mean = direct.sum(axis=1) / lengths[:, None]
+            indirect_mean = indirect.sum(axis=1) / lengths[:, None]
+
+        for i in range(len(chunk)):
+            summaries.append(Summary(
+                m0=int(a.m0[i]), m1=int(a.m1[i]), m2=int(a.m2[i]),
+                interruptions=int(a.interruptions[i]),
+                convergence_time=int(a.convergence_time[i]) if a.convergence_time[i] != -1 else None,
+                direct_mean=direct_mean[i],
+                indirect_mean=indirect_mean[i]
+            ))
+
+    return summaries
+
+
+def current_summary(result):
+
+    # Summary kept with the result, unless computed by another version of the code while it can be computed again
+    summary = getattr(result, "summary", None)
+    if summary is None:
+        return None
+
+    if summary.version != fingerprint() and getattr(result, "direct_exchanges_proportions", None) is not None:
+        return None
+
+    return summary
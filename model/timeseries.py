@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class SeriesRecorder:
+
+    def __init__(self, window=1000, max_blocks=1024, width=3):
+
+        self.t = 0
+
+        # Last 'window' steps at full resolution
+        self.window = window
+        self.recent = np.zeros((window, width))
+
+        # Whole history in at most 'max_blocks' blocks, whose size doubles when they are all used
+        self.max_blocks = max_blocks - max_blocks % 2
+        self.block_size = 1
+        self.n_blocks = 0
+        self.means = np.zeros((self.max_blocks, width))
+        self.mins = np.zeros((self.max_blocks, width))
+        self.maxs = np.zeros((self.max_blocks, width))
+
+        # Block being filled
+        self.count = 0
+        self.sum = np.zeros(width)
+        self.min = np.full(width, np.inf)
+        self.max = np.full(width, -np.inf)
+
+    def append(self, x):
+
+        self.recent[self.t % self.window] = x
+        self.t += 1
+
+        self.count += 1
+        self.sum += x
+        np.minimum(self.min, x, out=self.min)
+        np.maximum(self.max, x, out=self.max)
+
+        if self.count < self.block_size:
+            return
+
+        if self.n_blocks == self.max_blocks:
+            # Current block is half of the new size: it goes on
+            self._coarsen()
+            return
+
+        i = self.n_blocks
+        self.means[i] = self.sum / self.count
+        self.mins[i] = self.min
+        self.maxs[i] = self.max
+        self.n_blocks += 1
+
+        self.count = 0
+        self.sum[:] = 0
+        self.min[:] = np.inf
+        self.max[:] = -np.inf
+
+    def _coarsen(self):
+
+        n = self.n_blocks // 2
+        self.means[:n] = (self.means[0::2] + self.means[1::2]) / 2
+        self.mins[:n] = np.minimum(self.mins[0::2], self.mins[1::2])
+        self.maxs[:n] = np.maximum(self.maxs[0::2], self.maxs[1::2])
+        self.n_blocks = n
+        self.block_size *= 2
+
+    def last(self):
+
+        # Last steps, in chronological order
+        if self.t < self.window:
+            return self.recent[:self.t].copy()
+        return np.roll(self.recent, -(self.t % self.window), axis=0)
+
+    def aggregates(self):
+
+        # First step, mean, min and max of every block (the last one may be incomplete)
+        means, mins, maxs = self.means[:self.n_blocks], self.mins[:self.n_blocks], self.maxs[:self.n_blocks]
+
+        if self.count:
+            means = np.vstack((means, self.sum / self.count))
+            mins = np.vstack((mins, self.min))
+            maxs = np.vstack((maxs, self.max))
+
+        return np.arange(len(means)) * self.block_size, means, mins, maxs
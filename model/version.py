@@ -0,0 +1,24 @@
+import hashlib
+import functools
+import os
+
+
+# Modules of the 'model' package that determine the results: the simulation and the summaries
+# (not the asynchronous API, nor the data structures)
+result_modules = ("model.py", "run.py", "seeding.py", "pyramid.py", "timeseries.py", "statistics.py")
+
+
+@functools.lru_cache()
+def fingerprint():
+
+    # Hash of their source: any change in the simulation or in the summaries gives a new version
+    folder = os.path.dirname(os.path.abspath(__file__))
+
+    h = hashlib.sha1()
+
+    for f in result_modules:
+        h.update(f.encode())
+        with open(os.path.join(folder, f), "rb") as source:
+            h.update(source.read())
+
+    return h.hexdigest()[:12]
@@ -0,0 +1,138 @@
+import hashlib
+import pickle
+import json
+import time
+import os
+
+import numpy as np
+
+from model.version import fingerprint
+
+from . output import Output, reduce
+
+
+class Cache:
+
+    folder = "data/cache/"
+
+    # Eviction thresholds (bytes, seconds)
+    max_size = 20 * 2**30
+    max_age = 60 * 24 * 3600
+
+    def __init__(self, folder=None):
+
+        if folder is not None:
+            self.folder = folder
+
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def key(parameters):
+
+        # 'parameters' is a 'Parameters.__dict__', seed included
+        content = json.dumps(
+            {"parameters": parameters, "seed": parameters["seed"], "version": fingerprint()},
+            sort_keys=True, default=lambda x: x.item())
+
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    def path(self, key, output):
+        return "{}{}_{}.p".format(self.folder, key, output.name.lower())
+
+    def maps_file(self, key):
+        return "{}{}".format(self.folder, key)
+
+    def find(self, key, output=Output.SUMMARY):
+
+        # An entry with a higher output level can serve a lower one
+        for o in reversed(Output):
+            if o >= output and os.path.exists(self.path(key, o)):
+                return self.path(key, o)
+
+    def contains(self, key, output=Output.SUMMARY):
+        return self.find(key, output) is not None
+
+    def load(self, key, output=Output.SUMMARY):
+
+        file_name = self.find(key, output)
+        if file_name is None:
+            raise FileNotFoundError("No '{}' entry for run {} in '{}'".format(output.name.lower(), key, self.folder))
+
+        with open(file_name, "rb") as f:
+            r = pickle.load(f)
+
+        # Keep track of the last use for eviction
+        os.utime(file_name)
+        return reduce(r, output)
+
+    def _save_array(self, name, a):
+
+        # Same name as the maps written by the workers ('name' starts with the key)
+        file_name = "{}.npy".format(self.maps_file(name))
+        tmp_file = "{}.tmp".format(file_name)
+        with open(tmp_file, "wb") as f:
+            np.save(f, a)
+        os.replace(tmp_file, file_name)
+
+        return np.load(file_name, mmap_mode="r")
+
+    def save(self, key, result, output):
+
+        file_name = self.path(key, output)
+
+        # Maps received in memory (e.g. from a distributed worker) are written next to the entry
+        if output == Output.FULL:
+            for k in result.maps:
+                m = getattr(result, k)
+                if m is not None and getattr(m, "filename", None) is None:
+                    setattr(result, k, self._save_array("{}_{}".format(key, k), m))
+
+            if result.pyramid is not None:
+                for name in ("type_counts", "exchange_sums"):
+                    arrays = getattr(result.pyramid, name)
+                    for level, a in enumerate(arrays, 1):
+                        if getattr(a, "filename", None) is None:
+                            arrays[level - 1] = self._save_array("{}_pyramid_{}_{}".format(key, level, name), a)
+
+        # Write then rename, so that a crash never leaves a truncated entry
+        tmp_file = "{}.tmp".format(file_name)
+        with open(tmp_file, "wb") as f:
+            pickle.dump(result, f)
+        os.replace(tmp_file, file_name)
+
+        return file_name
+
+    def evict(self, max_size=None, max_age=None, keep=()):
+
+        max_size = self.max_size if max_size is None else max_size
+        max_age = self.max_age if max_age is None else max_age
+
+        # Group the files of an entry (pickles and maps) by key
+        groups = {}
+        for f in os.listdir(self.folder):
+            groups.setdefault(f.split("_")[0], []).append(os.path.join(self.folder, f))
+
+        # Entries in 'keep' (e.g. the sweep just done) count in the size but are never evicted
+        size = 0
+        entries = []
+        for key, files in groups.items():
+            stats = [os.stat(f) for f in files]
+            size += sum(s.st_size for s in stats)
+            if key not in keep:
+                entries.append((max(s.st_mtime for s in stats), sum(s.st_size for s in stats), key, files))
+
+        # Least recently used first
+        entries.sort()
+
+        now = time.time()
+
+        evicted = []
+        for mtime, f_size, key, files in entries:
+            if size <= max_size and now - mtime <= max_age:
+                break
+            for f in files:
+                os.remove(f)
+            size -= f_size
+            evicted.append(key)
+
+        return evicted
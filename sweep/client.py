@@ -0,0 +1,30 @@
+import multiprocessing.connection
+import os
+
+# Only the standard library is imported here, so that the client starts instantly
+
+address = "data/service.sock"
+
+authkey = os.environ.get("SPATIAL_MONEY_KEY", "spatial-money").encode()
+
+
+def request(parameters, output="full", progress=None):
+
+    # 'parameters' is a 'Parameters.__dict__'; 'progress' is called with each t
+    with multiprocessing.connection.Client(address, family="AF_UNIX", authkey=authkey) as conn:
+
+        conn.send(("run", (parameters, output)))
+
+        while True:
+            kind, content = conn.recv()
+
+            if kind == "progress":
+                if progress is not None:
+                    progress(content)
+
+            elif kind == "error":
+                raise RuntimeError(content)
+
+            else:
+                # Summary and location of the result in the cache
+                return content
@@ -0,0 +1,279 @@
+import multiprocessing.connection
+import multiprocessing
+import collections
+import ipaddress
+import threading
+import secrets
+import socket
+import queue
+import time
+import os
+
+import numpy as np
+
+from . cache import Cache
+from . workers import init_worker
+
+
+# Messages are pickles: only peers knowing the key may connect
+default_authkey = "spatial-money"
+
+
+def parse_address(address):
+
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def is_loopback(host):
+
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def get_authkey(host, coordinator=False):
+
+    key = os.environ.get("SPATIAL_MONEY_KEY")
+    if key:
+        return key.encode()
+
+    # Default key is public: only for connections that do not leave the machine
+    if is_loopback(host):
+        return default_authkey.encode()
+
+    if not coordinator:
+        raise RuntimeError(
+            "SPATIAL_MONEY_KEY must be set to the key printed by the coordinator to connect to '{}'".format(host))
+
+    key = secrets.token_hex(16)
+    print("Key of the workers: SPATIAL_MONEY_KEY={}".format(key))
+    return key.encode()
+
+
+class Coordinator:
+
+    # Seconds without heartbeat after which a task is given to another worker
+    lease = 60.
+
+    # Times a task is given again after a failure (or an expired lease)
+    retries = 2
+
+    def __init__(self, address):
+
+        self.address = parse_address(address)
+
+        self.tasks = []
+        self.waiting = collections.deque()
+        self.leases = {}
+        self.stolen = set()
+        self.done = set()
+        self.attempts = collections.Counter()
+        self.failed = []
+        self.results = queue.Queue()
+
+        self.lock = threading.Lock()
+        self.closed = False
+
+        self.listener = multiprocessing.connection.Listener(
+            self.address, authkey=get_authkey(self.address[0], coordinator=True))
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (OSError, multiprocessing.AuthenticationError):
+                if self.closed:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn, ), daemon=True).start()
+
+    def _serve(self, conn):
+
+        with conn:
+            while True:
+                try:
+                    request, content = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                with self.lock:
+                    conn.send(getattr(self, "_on_{}".format(request))(content))
+
+    def _on_get(self, content):
+
+        now = time.time()
+
+        # Tasks of workers that stopped sending heartbeats are given again
+        for j, expiry in list(self.leases.items()):
+            if expiry < now:
+                self._on_failed((j, "lease expired"))
+
+        if self.waiting:
+            j = self.waiting.popleft()
+
+        elif self.leases:
+            # Work stealing: an idle worker duplicates the oldest running task.
+            # This is harmless as runs are deterministic and the cache is content-addressed,
+            # except for maps that are written in place.
+            candidates = [j for j in sorted(self.leases, key=self.leases.get)
+                          if j not in self.stolen and all(r[3] is None for r in self.tasks[j])]
+            if not candidates:
+                return "wait"
+            j = candidates[0]
+            self.stolen.add(j)
+
+        elif len(self.done) == len(self.tasks):
+            # Sweep is over (or has not started yet)
+            return None if self.tasks else "wait"
+
+        else:
+            return "wait"
+
+        self.leases[j] = now + self.lease
+        return j, self.tasks[j]
+
+    def _on_heartbeat(self, j):
+
+        if j in self.leases:
+            self.leases[j] = time.time() + self.lease
+        return True
+
+    def _on_done(self, content):
+
+        j, results = content
+        if j not in self.done:
+            self.done.add(j)
+            self.leases.pop(j, None)
+            self.results.put(results)
+        return True
+
+    def _on_failed(self, content):
+
+        j, reason = content
+        if j in self.done:
+            return True
+
+        self.leases.pop(j, None)
+        self.attempts[j] += 1
+
+        if self.attempts[j] <= self.retries:
+            # Same task, therefore same seed
+            self.waiting.appendleft(j)
+        else:
+            # Given up: no results for this task
+            self.done.add(j)
+            self.failed.append(("Task {}".format(j), self.attempts[j], reason))
+            self.results.put([])
+
+        return True
+
+    def imap_unordered(self, tasks):
+
+        with self.lock:
+            self.tasks = tasks
+            self.waiting.extend(range(len(tasks)))
+
+        print("Waiting for workers on {}:{}".format(*self.address))
+
+        for _ in range(len(tasks)):
+            yield self.results.get()
+
+        for name, attempts, reason in self.failed:
+            print("{} failed {} times (last: {})".format(name, attempts, reason))
+
+    def close(self):
+
+        self.closed = True
+        self.listener.close()
+
+
+def _in_memory(result):
+
+    # Coordinator may not share the data folder: arrays on disk are sent, not their file names
+    for k in result.maps:
+        if getattr(getattr(result, k), "filename", None) is not None:
+            setattr(result, k, np.array(getattr(result, k)))
+
+    if result.pyramid is not None:
+        for arrays in (result.pyramid.type_counts, result.pyramid.exchange_sums):
+            arrays[:] = [np.array(a) for a in arrays]
+
+    return result
+
+
+def _work(address, func, threads):
+
+    init_worker(threads)
+
+    cache = Cache()
+
+    host, port = parse_address(address)
+    conn = multiprocessing.connection.Client((host, port), authkey=get_authkey(host))
+    lock = threading.Lock()
+
+    def request(*message):
+        with lock:
+            conn.send(message)
+            return conn.recv()
+
+    def heartbeat(j, stop):
+        while not stop.wait(Coordinator.lease / 3):
+            request("heartbeat", j)
+
+    while True:
+
+        try:
+            task = request("get", socket.gethostname())
+        except (EOFError, OSError):
+            break
+
+        if task is None:
+            break
+
+        if task == "wait":
+            time.sleep(1)
+            continue
+
+        j, runs = task
+
+        # Results are keyed on the code: a worker running another version must not contribute
+        if any(cache.key(r[1]) != r[4] for r in runs):
+            print("Worker code differs from the coordinator's, stopping")
+            break
+
+        stop = threading.Event()
+        threading.Thread(target=heartbeat, args=(j, stop), daemon=True).start()
+
+        try:
+            results = func(runs)
+        except Exception as e:
+            # Coordinator decides whether the task is given again
+            stop.set()
+            request("failed", (j, repr(e)))
+            continue
+
+        stop.set()
+        request("done", (j, [(i, _in_memory(r)) for i, r in results]))
+
+    conn.close()
+
+
+def work(address, func, n_workers=None, threads=1):
+
+    # Checked before starting the workers
+    get_authkey(parse_address(address)[0])
+
+    processes = [
+        multiprocessing.Process(target=_work, args=(address, func, threads))
+        for _ in range(n_workers or multiprocessing.cpu_count())
+    ]
+
+    for p in processes:
+        p.start()
+
+    for p in processes:
+        p.join()
@@ -0,0 +1,83 @@
+import datetime
+import json
+import glob
+import os
+
+
+class Journal:
+
+    folder = "data/sweeps/"
+
+    def __init__(self, name):
+
+        self.name = name
+        self.file_name = "{}{}.jsonl".format(self.folder, name)
+
+        self.parameters = None
+        self.done = {}
+        self.complete = False
+
+        # Opened at the first write, and kept open
+        self.file = None
+
+        if os.path.exists(self.file_name):
+            self.read()
+
+    @classmethod
+    def new(cls, parameters):
+
+        os.makedirs(cls.folder, exist_ok=True)
+
+        j = cls(datetime.datetime.now().strftime("pool_%y_%m_%d_%H_%M_%S_%f"))
+        j.parameters = parameters
+        j.write([{"parameters": parameters}])
+        return j
+
+    @classmethod
+    def latest(cls):
+
+        # Most recent sweep that did not reach its end
+        for f in sorted(glob.glob("{}pool*.jsonl".format(cls.folder)), reverse=True):
+            j = cls(os.path.basename(f)[:-len(".jsonl")])
+            if not j.complete:
+                return j
+
+    def read(self):
+
+        with open(self.file_name, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line may have been cut by a crash
+                    continue
+
+                if "parameters" in entry:
+                    self.parameters = entry["parameters"]
+                elif "complete" in entry:
+                    self.complete = True
+                else:
+                    self.done[entry["i"]] = entry["key"]
+
+    def write(self, entries):
+
+        # Entries are on disk when this returns (a single 'fsync' whatever their number)
+        if self.file is None:
+            self.file = open(self.file_name, "a")
+
+        self.file.write("".join(json.dumps(e) + "\n" for e in entries))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record(self, runs):
+
+        # 'runs' are (i, key) pairs, e.g. a batch of results
+        runs = list(runs)
+        self.done.update(runs)
+        self.write([{"i": i, "key": key} for i, key in runs])
+
+    def close(self):
+
+        self.complete = True
+        self.write([{"complete": True}])
+        self.file.close()
@@ -0,0 +1,33 @@
+import enum
+
+from model.statistics import summarize, current_summary
+
+
+class Output(enum.IntEnum):
+
+    SUMMARY = 0  # Money analysis and mean proportions only
+    SERIES = 1  # + exchanges proportions over time
+    FULL = 2  # + maps (if 'graphics')
+
+    @classmethod
+    def get(cls, name):
+        return cls[name.upper()]
+
+
+def reduce(result, output):
+
+    if current_summary(result) is None:
+        result.summary = summarize(result)
+
+    if output < Output.FULL:
+        result.agent_maps = None
+        result.exchange_maps = None
+        result.pyramid = None
+
+    if output < Output.SERIES:
+        result.direct_exchanges_proportions = None
+        result.indirect_exchanges_proportions = None
+        result.direct_series = None
+        result.indirect_series = None
+
+    return result
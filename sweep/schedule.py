@@ -0,0 +1,126 @@
+import numpy as np
+
+
+class CostModel:
+
+    # Seconds per unit of each feature, used until enough runs have been timed
+    default_coefficients = np.array([2e-4, 2e-6, 1e-5, 5e-5, 2e-8])
+
+    # Timings used for calibration (most recent runs)
+    n_timings = 10000
+
+    def __init__(self, coefficients=None):
+
+        self.coefficients = self.default_coefficients if coefficients is None else coefficients
+
+    @staticmethod
+    def features(p):
+
+        # 'p' is a 'Parameters.__dict__' (or a catalog row)
+        n = p["x0"] + p["x1"] + p["x2"]
+        window_area = (2 * p["vision_area"] + 1) ** 2
+        map_area = p["map_width"] * p["map_height"]
+
+        # Each step, each agent scans the whole population then asks its neighbours
+        steps = p["t_max"] * n
+        neighbours = min(n, n / map_area * window_area)
+
+        return np.array([
+            steps,
+            steps * n,
+            steps * neighbours,
+            steps * (p["stride"] > 0),
+            p["t_max"] * map_area * p["graphics"]
+        ], dtype=float)
+
+    @classmethod
+    def calibrate(cls, catalog):
+
+        rows = catalog.select(
+            "duration IS NOT NULL ORDER BY ID DESC LIMIT {}".format(cls.n_timings))
+
+        if len(rows) < 2 * len(cls.default_coefficients):
+            return cls()
+
+        x = np.array([cls.features(r) for r in rows])
+        y = np.array([r["duration"] for r in rows])
+
+        coefficients = np.linalg.lstsq(x, y, rcond=None)[0]
+
+        # A negative cost has no meaning, keep the default instead
+        coefficients = np.where(coefficients > 0, coefficients, cls.default_coefficients)
+
+        return cls(coefficients)
+
+    def estimate(self, p):
+        return float(self.features(p) @ self.coefficients)
+
+
+class Scheduler:
+
+    # Runs cheaper than that (in seconds) are fused together in tasks of about that cost
+    batch_cost = 1.
+
+    def __init__(self, cost_model, n_workers, thread_cost=None):
+
+        self.cost_model = cost_model
+        self.n_workers = n_workers
+
+        # Runs cheaper than that (in seconds) are run in threads of the parent process
+        self.thread_cost = thread_cost
+
+    def split(self, runs):
+
+        # Runs for the processes, runs for the threads
+        if self.thread_cost is None:
+            return runs, []
+
+        cheap = [self.cost_model.estimate(r[1]) < self.thread_cost for r in runs]
+        return [r for r, c in zip(runs, cheap) if not c], [r for r, c in zip(runs, cheap) if c]
+
+    def schedule(self, runs):
+
+        # 'runs' is a list of tuples whose second element is a 'Parameters.__dict__'
+        costs = [self.cost_model.estimate(r[1]) for r in runs]
+
+        # Longest runs first
+        order = np.argsort(costs)[::-1]
+
+        tasks = []
+        task_costs = []
+
+        batch = []
+        batch_cost = 0
+
+        for i in order:
+
+            if costs[i] >= self.batch_cost:
+                tasks.append([runs[i]])
+                task_costs.append(costs[i])
+                continue
+
+            batch.append(runs[i])
+            batch_cost += costs[i]
+
+            if batch_cost >= self.batch_cost:
+                tasks.append(batch)
+                task_costs.append(batch_cost)
+                batch = []
+                batch_cost = 0
+
+        if batch:
+            tasks.append(batch)
+            task_costs.append(batch_cost)
+
+        return tasks, task_costs
+
+    def projected_duration(self, task_costs, thread_runs=()):
+
+        # Tasks are taken in order by the first available worker
+        load = np.zeros(self.n_workers)
+        for c in task_costs:
+            load[np.argmin(load)] += c
+
+        # Threads share the interpreter of the parent
+        return max(np.max(load) if len(task_costs) else 0.,
+                   sum(self.cost_model.estimate(r[1]) for r in thread_runs))
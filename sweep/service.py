@@ -0,0 +1,179 @@
+import multiprocessing.connection
+import multiprocessing
+import threading
+import signal
+import queue
+import os
+
+import analysis.catalog
+
+from . cache import Cache
+from . output import Output
+from . client import address, authkey
+
+
+def _work(conn, func):
+
+    # Interruptions are handled by the service
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while True:
+
+        task = conn.recv()
+        if task is None:
+            break
+
+        try:
+            _, r = func(task, callback=lambda t: conn.send(("progress", t)))
+            conn.send(("result", r))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+
+
+class _Running:
+
+    def __init__(self):
+
+        # Simulation in progress, followed by every client that requested it
+        self.done = threading.Event()
+        self.listeners = []
+
+    def progress(self, message):
+        for f in list(self.listeners):
+            f(message)
+
+
+class Service:
+
+    def __init__(self, func, n_workers=None):
+
+        self.func = func
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+
+        self.cache = Cache()
+
+        # Key: '_Running' (a second request for a run in progress waits for it instead of running it again)
+        self.running = {}
+        self.lock = threading.Lock()
+
+        # Workers are started once, with everything already imported
+        self.idle = queue.Queue()
+        for _ in range(self.n_workers):
+            self.idle.put(self._start())
+
+    def _start(self):
+
+        conn, child_conn = multiprocessing.Pipe()
+        p = multiprocessing.Process(target=_work, args=(child_conn, self.func), daemon=True)
+        p.start()
+        child_conn.close()
+        return p, conn
+
+    def serve_forever(self):
+
+        if os.path.exists(address):
+            os.remove(address)
+
+        listener = multiprocessing.connection.Listener(address, family="AF_UNIX", authkey=authkey)
+        print("Listening on '{}' with {} workers".format(address, self.n_workers))
+
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, multiprocessing.AuthenticationError):
+                    continue
+                threading.Thread(target=self._handle, args=(conn, ), daemon=True).start()
+
+        finally:
+            listener.close()
+            while not self.idle.empty():
+                self.idle.get()[0].kill()
+
+    def _handle(self, conn):
+
+        def progress(message):
+            # A client that has gone does not stop the simulation
+            try:
+                conn.send(message)
+            except OSError:
+                pass
+
+        with conn:
+            try:
+                request, (parameters, output) = conn.recv()
+                conn.send(self._run(parameters, Output.get(output), progress=progress))
+            except (EOFError, OSError):
+                # Client has gone
+                pass
+            except Exception as e:
+                conn.send(("error", repr(e)))
+
+    def _run(self, parameters, output, progress):
+
+        key = self.cache.key(parameters)
+
+        while not self.cache.contains(key, output):
+
+            with self.lock:
+                running = self.running.get(key)
+                if running is None:
+                    running = self.running[key] = _Running()
+                    owner = True
+                else:
+                    owner = False
+                running.listeners.append(progress)
+
+            if not owner:
+                # Same files would be written twice: the result is read from the cache once there
+                running.done.wait()
+                continue
+
+            try:
+                error = self._simulate(key, parameters, output, running.progress)
+            finally:
+                with self.lock:
+                    del self.running[key]
+                running.done.set()
+
+            if error is not None:
+                return error
+
+        s = self.cache.load(key, Output.SUMMARY).summary
+
+        return "result", {
+            "file_name": self.cache.find(key, output),
+            "m0": s.m0, "m1": s.m1, "m2": s.m2,
+            "interruptions": s.interruptions,
+            "convergence_time": s.convergence_time
+        }
+
+    def _simulate(self, key, parameters, output, progress):
+
+        p, conn = self.idle.get()
+
+        try:
+            maps_file = self.cache.maps_file(key) if output == Output.FULL else None
+            conn.send((0, parameters, output, maps_file, key))
+
+            while True:
+                kind, content = conn.recv()
+                if kind == "progress":
+                    progress((kind, content))
+                elif kind == "error":
+                    return kind, content
+                else:
+                    break
+
+        except (EOFError, OSError):
+            p.kill()
+            p, conn = self._start()
+            return "error", "worker died"
+
+        finally:
+            self.idle.put((p, conn))
+
+        # Catalog connection can not be shared between threads
+        catalog = analysis.catalog.Catalog()
+        catalog.insert(content, file_name=self.cache.path(key, output))
+        catalog.close()
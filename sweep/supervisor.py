@@ -0,0 +1,263 @@
+import concurrent.futures
+import multiprocessing
+import asyncio
+import signal
+import time
+import os
+
+import model.asynchronous
+
+from . workers import init_worker, total_memory
+
+
+def _work(conn, func, threads, cpu):
+
+    # Interruptions are handled by the supervisor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    init_worker(threads, cpu)
+
+    while True:
+
+        task = conn.recv()
+        if task is None:
+            break
+
+        try:
+            conn.send((True, func(task)))
+        except Exception as e:
+            conn.send((False, repr(e)))
+
+
+class Worker:
+
+    def __init__(self, func, threads, cpu):
+
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_work, args=(child_conn, func, threads, cpu), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        # Set by the supervisor when it kills the process
+        self.failure = None
+
+    async def recv(self):
+        return await model.asynchronous.recv(self.conn)
+
+    def memory(self):
+
+        # Resident set size (Linux only)
+        try:
+            with open("/proc/{}/statm".format(self.process.pid)) as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return 0
+
+    def kill(self, failure=None):
+
+        self.failure = failure
+        self.process.kill()
+        self.process.join()
+
+    def close(self):
+
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+
+class Supervisor:
+
+    # Fraction of the physical memory used when no budget is given
+    memory_fraction = 0.8
+
+    # Seconds between two memory checks
+    poll = 1.
+
+    # Threads of the parent process running the cheapest runs
+    n_threads = 2
+
+    def __init__(self, func, n_workers=None, threads=1, affinity=False, memory_budget=None,
+                 timeout=None, memory_limit=None, retries=2):
+
+        self.func = func
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.threads = threads
+
+        self.cpus = sorted(os.sched_getaffinity(0)) if affinity and hasattr(os, "sched_getaffinity") else None
+
+        if memory_budget is None and total_memory() is not None:
+            memory_budget = self.memory_fraction * total_memory()
+        self.memory_budget = memory_budget
+
+        self.timeout = timeout  # Seconds per run
+        self.memory_limit = memory_limit  # Bytes per worker
+        self.retries = retries
+
+        self.workers = {}
+        self.failed = []
+
+        self.t0 = None
+        self.n_runs = 0
+        self.n_agent_steps = 0
+
+    def throughput(self):
+
+        elapsed = max(time.time() - self.t0, 1e-6)
+        return {
+            "runs/min": "{:.1f}".format(self.n_runs / elapsed * 60),
+            "agent-steps/s": "{:.0f}".format(self.n_agent_steps / elapsed)
+        }
+
+    async def run(self, tasks, memory, callback, thread_runs=()):
+
+        # 'callback' receives the results of each task as soon as it is done.
+        # 'thread_runs' are not worth a process: they run in threads, without pickling.
+        self.t0 = time.time()
+
+        self.tasks = tasks
+        self.memory = memory
+        self.callback = callback
+
+        self.waiting = list(range(len(tasks)))
+        self.attempts = [0, ] * len(tasks)
+        self.used = 0
+        self.running = 0
+        self.changed = asyncio.Condition()
+
+        monitor = asyncio.create_task(self._monitor())
+
+        try:
+            await asyncio.gather(
+                self._threads(thread_runs),
+                *(self._slot(k) for k in range(self.n_workers)))
+
+        finally:
+            # Also on Ctrl-C: no worker outlives the sweep
+            monitor.cancel()
+            for w in self.workers.values():
+                w.close()
+            self.workers.clear()
+
+        for name, attempts, reason in self.failed:
+            print("{} failed {} times (last: {})".format(name, attempts, reason))
+
+    def _fits(self, memory):
+        return self.memory_budget is None or self.used + memory <= self.memory_budget
+
+    async def _next(self):
+
+        async with self.changed:
+            while True:
+
+                j = next((j for j in self.waiting if self._fits(self.memory[j])), None)
+
+                if j is None and self.waiting and not self.running:
+                    # Too big for the budget anyway: run it alone
+                    print("Warning: task exceeds the memory budget ({:.1f} GB)".format(
+                        self.memory[self.waiting[0]] / 2**30))
+                    j = self.waiting[0]
+
+                if j is not None:
+                    self.waiting.remove(j)
+                    self.used += self.memory[j]
+                    self.running += 1
+                    return j
+
+                if not self.running:
+                    # Nothing left, not even a task that could be retried
+                    return None
+
+                await self.changed.wait()
+
+    async def _release(self, j, failure):
+
+        async with self.changed:
+            self.used -= self.memory[j]
+            self.running -= 1
+
+            if failure is not None:
+                self.attempts[j] += 1
+                if self.attempts[j] <= self.retries:
+                    # Same task, therefore same seed
+                    self.waiting.insert(0, j)
+                else:
+                    self.failed.append(("Task {}".format(j), self.attempts[j], failure))
+
+            self.changed.notify_all()
+
+    async def _slot(self, k):
+
+        cpu = self.cpus[k % len(self.cpus)] if self.cpus else None
+
+        while True:
+
+            j = await self._next()
+            if j is None:
+                break
+
+            if k not in self.workers:
+                self.workers[k] = Worker(self.func, self.threads, cpu)
+            w = self.workers[k]
+
+            timeout = self.timeout * len(self.tasks[j]) if self.timeout is not None else None
+
+            failure = None
+            try:
+                w.conn.send(self.tasks[j])
+                success, r = await asyncio.wait_for(w.recv(), timeout)
+                if not success:
+                    failure = r
+
+            except asyncio.TimeoutError:
+                w.kill("timeout")
+                failure = "timeout"
+
+            except (EOFError, OSError):
+                failure = w.failure or "worker died"
+
+            if failure is not None and (w.failure is not None or not w.process.is_alive()):
+                w.close()
+                del self.workers[k]
+
+            if failure is None:
+                self._done(self.tasks[j], r)
+
+            await self._release(j, failure)
+
+    def _done(self, task, results):
+
+        self.n_runs += len(results)
+        self.n_agent_steps += sum(p["t_max"] * (p["x0"] + p["x1"] + p["x2"]) for _, p, *_ in task)
+        self.callback(results)
+
+    async def _threads(self, runs):
+
+        if not runs:
+            return
+
+        loop = asyncio.get_running_loop()
+
+        async def run_in_thread(executor, r):
+            for attempt in range(1, self.retries + 2):
+                try:
+                    results = await loop.run_in_executor(executor, self.func, [r])
+                except Exception as e:
+                    failure = repr(e)
+                else:
+                    self._done([r], results)
+                    return
+            self.failed.append(("Run {}".format(r[0]), attempt, failure))
+
+        with concurrent.futures.ThreadPoolExecutor(self.n_threads) as executor:
+            await asyncio.gather(*(run_in_thread(executor, r) for r in runs))
+
+    async def _monitor(self):
+
+        while True:
+            await asyncio.sleep(self.poll)
+            if self.memory_limit is not None:
+                for w in list(self.workers.values()):
+                    if w.failure is None and w.memory() > self.memory_limit:
+                        w.kill("memory limit")
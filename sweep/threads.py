@@ -0,0 +1,16 @@
+import os
+
+# Environment variables read by the native libraries NumPy may rely on, when they are loaded
+thread_variables = (
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+
+def limit_threads(threads):
+
+    for v in thread_variables:
+        os.environ[v] = str(threads)
+
+
+def is_limited(threads):
+    return all(os.environ.get(v) == str(threads) for v in thread_variables)
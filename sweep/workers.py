@@ -0,0 +1,54 @@
+import sys
+import os
+
+from . output import Output
+from . threads import limit_threads, is_limited
+
+# Interpreter, NumPy and model arrays (bytes)
+base_memory = 100 * 2**20
+
+
+def estimate_memory(p, output):
+
+    # 'p' is a 'Parameters.__dict__'; map histories are the only big arrays and their size is known
+    memory = base_memory + 2 * p["t_max"] * 3 * 8
+
+    # Maps are only recorded with the full output
+    if p["graphics"] and output == Output.FULL:
+        memory += p["t_max"] * 4 * p["map_width"] * p["map_height"] * 8
+
+    if p.get("pyramid") and output == Output.FULL:
+        # Two int32 arrays of 3 maps per level, 1/16 + 1/256 + ... < 1/15 of the cells
+        memory += p["t_max"] * 6 * p["map_width"] * p["map_height"] * 4 // 15
+
+    if output < Output.SERIES:
+        memory -= 2 * p["t_max"] * 3 * 8
+
+    return memory
+
+
+def total_memory():
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def init_worker(threads, cpu=None):
+
+    # Set before NumPy was imported (see main.py), the environment is enough
+    preset = is_limited(threads)
+    limit_threads(threads)
+
+    # Libraries already loaded do not read the environment anymore
+    try:
+        import threadpoolctl
+        threadpoolctl.threadpool_limits(threads)
+    except ImportError:
+        if not preset and "numpy" in sys.modules:
+            print("Warning: threadpoolctl is not installed, "
+                  "native libraries may not be limited to {} thread(s)".format(threads))
+
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})